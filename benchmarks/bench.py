@@ -0,0 +1,238 @@
+"""
+Throughput benchmark of the public functions of vsdeinterlace.
+
+Every function is run on synthetic sources at several resolutions and bit depths,
+and the results are written as JSON so that runs on different releases can be compared.
+
+.. code-block:: sh
+
+    python benchmarks/bench.py --frames 500 --output bench_output.json
+    python benchmarks/bench.py --functions vfm vdecimate --resolutions 1080p --depths 16
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass, field
+from threading import Condition
+from time import perf_counter
+from typing import Any, Callable
+
+from vstools import core, vs
+
+from vsdeinterlace import (
+    deblend, deblend_bob, fix_interlaced_fades, jivtc, sivtc, telecine, telop_resample, vdecimate, vfm, vinverse
+)
+from vsdeinterlace._metadata import __version__
+
+RESOLUTIONS = {
+    'sd': (720, 480),
+    '1080p': (1920, 1080),
+    'uhd': (3840, 2160),
+}
+
+FORMATS = {
+    8: vs.YUV420P8,
+    16: vs.YUV420P16,
+    32: vs.YUV444PS,
+}
+
+
+def _bob(clip: vs.VideoNode) -> vs.VideoNode:
+    return clip.resize.Bob(tff=True).std.AssumeFPS(fpsnum=60000, fpsden=1001)
+
+
+BENCHMARKS: dict[str, Callable[[vs.VideoNode], vs.VideoNode]] = {
+    'sivtc': lambda clip: sivtc(clip, 0),
+    'jivtc': lambda clip: jivtc(clip, 0),
+    'vfm': lambda clip: vfm(clip, True),
+    'vdecimate': lambda clip: vdecimate(clip),
+    'deblend': lambda clip: deblend(clip),
+    'deblend_bob': lambda clip: deblend_bob(_bob(clip)),
+    'vinverse': lambda clip: vinverse(clip),
+    'fix_interlaced_fades': lambda clip: fix_interlaced_fades(clip),
+    'telop_resample': lambda clip: telop_resample.TXT60i_on_24telecined(_bob(clip), 0),
+}
+
+
+@dataclass
+class BenchResult:
+    function: str
+    resolution: str
+    bits: int
+    frames: int = 0
+    seconds: float = 0.0
+    fps: float = 0.0
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    peak_framebuffer_bytes: int = 0
+    error: str | None = None
+
+
+def make_source(resolution: str, bits: int, length: int) -> vs.VideoNode:
+    """
+    Build a 29.97 fps top field first synthetic source, telecined with 3:2 pulldown
+    from a 23.976 fps clip with a moving ramp if akarin is available.
+    """
+
+    width, height = RESOLUTIONS[resolution]
+
+    clip = core.std.BlankClip(
+        width=width, height=height, format=FORMATS[bits], length=length * 4 // 5 + 1,
+        fpsnum=24000, fpsden=1001, keep=True
+    )
+
+    if hasattr(core, 'akarin'):
+        scale = '255 /' if bits == 32 else f'{1 << (bits - 8)} *'
+
+        clip = clip.akarin.Expr([f'X Y + N 4 * + 256 % {scale}', ''])
+
+    return telecine(clip, '3:2', tff=True)[:length]
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+
+    if not values:
+        return 0.0
+
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def run(clip: vs.VideoNode, requests: int, warmup: int) -> tuple[float, list[float], int]:
+    """
+    Render a clip with up to ``requests`` frames in flight.
+
+    :return:    Elapsed seconds of the measured frames, latency of every measured frame in ms,
+                and peak size of the frame cache in bytes.
+    """
+
+    for n in range(min(warmup, clip.num_frames)):
+        clip.get_frame(n)
+
+    frames = range(min(warmup, clip.num_frames), clip.num_frames)
+    latencies = list[float]()
+    peak = 0
+    errors = list[BaseException]()
+
+    cond = Condition()
+    inflight = 0
+
+    def _done(start: float, fut: Any) -> None:
+        nonlocal inflight, peak
+
+        with cond:
+            if (exc := fut.exception()) is not None:
+                errors.append(exc)
+
+            latencies.append((perf_counter() - start) * 1000)
+            peak = max(peak, core.core_info.used_framebuffer_size)
+            inflight -= 1
+            cond.notify()
+
+    start = perf_counter()
+
+    for n in frames:
+        with cond:
+            cond.wait_for(lambda: inflight < requests)
+            inflight += 1
+
+        now = perf_counter()
+        clip.get_frame_async(n).add_done_callback(lambda fut, now=now: _done(now, fut))
+
+    with cond:
+        cond.wait_for(lambda: inflight == 0)
+
+    elapsed = perf_counter() - start
+
+    if errors:
+        raise errors[0]
+
+    return elapsed, latencies, peak
+
+
+def bench(name: str, resolution: str, bits: int, length: int, requests: int, warmup: int) -> BenchResult:
+    result = BenchResult(name, resolution, bits)
+
+    try:
+        clip = BENCHMARKS[name](make_source(resolution, bits, length))
+        elapsed, latencies, peak = run(clip, requests, warmup)
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+        return result
+    finally:
+        gc.collect()
+
+    result.frames = len(latencies)
+    result.seconds = round(elapsed, 4)
+    result.fps = round(len(latencies) / elapsed, 3) if elapsed else 0.0
+    result.latency_ms = {
+        key: round(percentile(latencies, q), 3)
+        for key, q in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)]
+    }
+    result.peak_framebuffer_bytes = peak
+
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--functions', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument('--depths', nargs='+', type=int, choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--frames', type=int, default=200, help='Frames of every source clip.')
+    parser.add_argument('--warmup', type=int, default=10, help='Frames rendered before measuring.')
+    parser.add_argument('--threads', type=int, default=0, help='VapourSynth threads. Default: all cores.')
+    parser.add_argument('--requests', type=int, default=0, help='Frames in flight. Default: the thread count.')
+    parser.add_argument('--output', default='-', help='JSON output file, or - for stdout.')
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        core.num_threads = args.threads
+
+    requests = args.requests or core.num_threads
+
+    results = list[BenchResult]()
+
+    for name in args.functions:
+        for resolution in args.resolutions:
+            for bits in args.depths:
+                result = bench(name, resolution, bits, args.frames, requests, args.warmup)
+                results.append(result)
+
+                print(
+                    f'{name:>22} {resolution:>6} {bits:>2}-bit: '
+                    + (result.error or f'{result.fps:9.2f} fps, p99 {result.latency_ms["p99"]:.2f} ms'),
+                    file=sys.stderr
+                )
+
+    report = dict(
+        vsdeinterlace=__version__,
+        vapoursynth=core.version_number(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        threads=core.num_threads,
+        requests=requests,
+        max_cache_size=core.max_cache_size,
+        results=[asdict(result) for result in results],
+    )
+
+    text = json.dumps(report, indent=2)
+
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+
+    return 0 if all(result.error is None for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,12 @@
 # ruff: noqa: F401, F403
 
 from .blending import *
+from .chunks import *
 from .funcs import *
+from .instrument import *
 from .ivtc import *
+from .postprocess import *
+from .sections import *
+from .stats import *
+from .telecine import *
 from .utils import *
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 from typing import Any, cast
 
-from vsexprtools import complexpr_available, expr_func, norm_expr
-from vstools import VSFunction, join, shift_clip, shift_clip_multi, vs
+from vsexprtools import ExprVars, complexpr_available, norm_expr
+from vstools import (
+    CustomValueError, FieldBased, VSFunction, VSFunctionNoArgs, core, get_peak_value, get_prop, join,
+    normalize_planes, scale_delta, shift_clip, shift_clip_multi, vs
+)
 
 from .funcs import vinverse
-from .utils import telecine_patterns
+from .instrument import instrumented
 
 __all__ = [
     'deblending_helper',
@@ -17,46 +20,114 @@ __all__ = [
 ]
 
 
-def deblending_helper(deblended: vs.VideoNode, fieldmatched: vs.VideoNode, length: int = 5) -> vs.VideoNode:
+def _select_available() -> bool:
+    # akarin.Select evaluates the index from the props natively, without calling back into Python for every frame
+    return hasattr(core, 'akarin') and hasattr(core.akarin, 'Select')
+
+
+@instrumented
+def deblending_helper(
+    deblended: vs.VideoNode, fieldmatched: vs.VideoNode, length: int = 5, fix_kf: bool = False
+) -> vs.VideoNode:
     """
     Helper function to select a deblended clip pattern from a fieldmatched clip.
 
+    A combed frame is replaced by the deblended one, unless the next frame is combed too,
+    in which case the next fieldmatched frame is used. The source of every frame is picked
+    from the ``_Combed`` props of the frame and the next one, so the graph has the same size for any pattern length.
+
     :param deblended:       Deblended clip.
     :param fieldmatched:    Source after field matching, must have field=3 and possibly low cthresh.
-    :param length:          Length of the pattern.
+    :param length:          Length of the pattern. With a length of 1, the next deblended frame is used instead.
+    :param fix_kf:          Also fix the blended keyframes like :py:func:`deblend_fix_kf`, in the same selection.
+                            The pattern and the scene change are read from a single set of props,
+                            instead of stacking a second selector on top of this one.
 
     :return: Deblended clip.
     """
-    inters = telecine_patterns(fieldmatched, deblended, length)
-    inters += [shift_clip(inter, 1) for inter in inters]
 
-    inters.insert(0, fieldmatched)
+    # The last frame has no next one, so it's always deblended
+    next_frame = shift_clip(deblended, 1) if length == 1 else fieldmatched[1:] + deblended[-1]
 
-    prop_srcs = shift_clip_multi(fieldmatched, (0, 1))
+    if not fix_kf:
+        sources = [fieldmatched, deblended, next_frame]
+
+        prop_srcs = shift_clip_multi(fieldmatched, (0, 1))
+
+        if _select_available():
+            return core.akarin.Select(sources, prop_srcs, 'x._Combed y._Combed 2 1 ? 0 ?')
+
+        def _deblend_eval(n: int, f: list[vs.VideoFrame]) -> vs.VideoNode:
+            if f[0].props._Combed != 1:
+                return sources[0]
+
+            return sources[2 if f[1].props._Combed == 1 else 1]
+
+        return fieldmatched.std.FrameEval(_deblend_eval, prop_srcs)
 
-    if complexpr_available:
-        index_src = expr_func(
-            prop_srcs, f'x._Combed N {length} % 1 + y._Combed {length} 0 ? + 0 ?', vs.GRAY8
+    # The keyframe fix takes the selected frame of the previous or next frame,
+    # so the three sources are given for every offset and the props from n - 1 to n + 2 are read at once
+    sources = [
+        clip for shifted in zip(*map(shift_clip_multi, (fieldmatched, deblended, next_frame))) for clip in shifted
+    ]
+
+    prop_srcs = shift_clip_multi(fieldmatched, (-1, 2))
+
+    if _select_available():
+        def _pattern(a: str, b: str) -> str:
+            return f'{a}._Combed {b}._Combed 2 1 ? 0 ?'
+
+        return core.akarin.Select(
+            sources, prop_srcs,
+            f'y._Combed y.VFMSceneChange and z.VFMSceneChange 6 {_pattern("z", "a")} + {_pattern("x", "y")} ? '
+            f'3 {_pattern("y", "z")} + ?'
         )
 
-        return fieldmatched.std.FrameEval(lambda n, f: inters[f[0][0, 0]], index_src)  # type: ignore
+    def _deblend_kf_eval(n: int, f: list[vs.VideoFrame]) -> vs.VideoNode:
+        offset = 1
 
-    def _deblend_eval(n: int, f: list[vs.VideoFrame]) -> vs.VideoNode:
-        idx = 0
+        if f[1].props._Combed == 1 and f[1].props.VFMSceneChange == 1:
+            offset = 2 if f[2].props.VFMSceneChange == 1 else 0
 
-        if f[0].props._Combed == 1:
-            idx += (n % length) + 1
+        if f[offset].props._Combed != 1:
+            return sources[offset * 3]
+
+        return sources[offset * 3 + (2 if f[offset + 1].props._Combed == 1 else 1)]
+
+    return fieldmatched.std.FrameEval(_deblend_kf_eval, prop_srcs)
+
+
+def _fused_deblend_expr(
+    clip: vs.VideoNode, contra_str: float = 2.0, amnt: int = 255, scl: float = 0.25, thr: int = 0
+) -> tuple[str, str]:
+    def _rel(var: str, y: int) -> str:
+        return f'{var}[0,{y}]' if y else var
+
+    clamp = '' if clip.format.sample_type == vs.FLOAT else f' 0 {get_peak_value(clip)} clip'
+
+    # Deblended pixels of the rows around the current one, as the vertical [1, 2, 1] blurs need them
+    rows = ' '.join(
+        f'{_rel("z", y)} {_rel("a", y)} 2 / - {_rel("y", y)} {_rel("x", y)} 2 / - +{clamp} R{y + 2}!'
+        for y in range(-2, 3)
+    )
 
-            if f[1].props._Combed == 1:
-                idx += length
+    blurs = (
+        'R0@ R1@ 2 * + R2@ + 4 / B0! R1@ R2@ 2 * + R3@ + 4 / B1! R2@ R3@ 2 * + R4@ + 4 / B2! '
+        'B0@ B1@ 2 * + B2@ + 4 / BB!'
+    )
 
-        return inters[idx]
+    decomb = (
+        'R2@ B1@ - D1! D1@ abs D1A! D1A@ {thr} < R2@ B1@ BB@ - {sstr} * D2! D1A@ D2@ abs < D1@ D2@ ? D3! '
+        'D1@ D2@ xor D3@ {scl} * D3@ ? B1@ + R2@ {amnt} - R2@ {amnt} + clip ?'
+    ).format(thr=scale_delta(thr, 8, clip), sstr=contra_str, scl=scl, amnt=scale_delta(amnt, 8, clip))
 
-    return fieldmatched.std.FrameEval(_deblend_eval, prop_srcs)
+    return f'{rows} {blurs} {decomb}', 'z a 2 / - y x 2 / - +'
 
 
+@instrumented
 def deblend(
-    src: vs.VideoNode, fieldmatched: vs.VideoNode | None = None, decomber: VSFunction | None = vinverse, **kwargs: Any
+    src: vs.VideoNode, fieldmatched: vs.VideoNode | None = None, decomber: VSFunction | None = vinverse,
+    fused: bool = False, fix_kf: bool = False, **kwargs: Any
 ) -> vs.VideoNode:
     """
     Automatically deblends if normal field matching leaves 2 blends every 5 frames. Adopted from jvsfunc.
@@ -64,54 +135,124 @@ def deblend(
     :param src:             Input source to fieldmatching.
     :param fieldmatched:    Source after field matching, must have field=3 and possibly low cthresh.
     :param decomber:        Optional post processing decomber after deblending and before pattern matching.
+    :param fused:           Compute the deblending and the default :py:func:`vinverse` decomber
+                            in a single akarin expression, reading the neighbouring rows of the source directly
+                            instead of rendering the deblended and blurred clips in between.
+                            Only the ``contra_str``, ``amnt``, ``scl``, ``thr`` and ``planes`` arguments
+                            of ``vinverse`` are supported. The output matches the unfused one up to rounding.
+    :param fix_kf:          Fix the blended keyframes in the same selection as the pattern.
+                            Equivalent to :py:func:`deblend_fix_kf` on the output. Requires ``fieldmatched``.
 
     :return: Deblended clip.
     """
 
-    deblended = norm_expr(shift_clip_multi(src, (-1, 2)), 'z a 2 / - y x 2 / - +')
+    if fix_kf and not fieldmatched:
+        raise CustomValueError('The keyframe fix requires a fieldmatched clip!', deblend)
 
-    if decomber:
-        deblended = decomber(deblended, **kwargs)
+    if fused:
+        if not complexpr_available:
+            raise ExprVars._get_akarin_err()(func=deblend)
+
+        if decomber is not vinverse or not kwargs.keys() <= {'contra_str', 'amnt', 'scl', 'thr', 'planes'}:
+            raise CustomValueError('The fused mode only supports vinverse with its default blurs!', deblend)
+
+        planes = normalize_planes(src, kwargs.pop('planes', None))
+
+        decombed, deblended_only = _fused_deblend_expr(src, **kwargs)
+
+        deblended = core.akarin.Expr(
+            shift_clip_multi(src, (-1, 2)),
+            [decombed if i in planes else deblended_only for i in range(src.format.num_planes)],
+            boundary=1
+        )
+    else:
+        deblended = norm_expr(shift_clip_multi(src, (-1, 2)), 'z a 2 / - y x 2 / - +')
+
+        if decomber:
+            deblended = decomber(deblended, **kwargs)
 
     if fieldmatched:
-        deblended = deblending_helper(fieldmatched, deblended)
+        deblended = deblending_helper(deblended, fieldmatched, fix_kf=fix_kf)
 
     return join(fieldmatched or src, deblended)
 
 
+@instrumented
 def deblend_bob(
     bobbed: vs.VideoNode | tuple[vs.VideoNode, vs.VideoNode],
-    fieldmatched: vs.VideoNode | None = None, blend_out: bool = False
+    fieldmatched: vs.VideoNode | None = None, blend_out: bool = False,
+    fields: bool = False, interpolate: VSFunctionNoArgs | None = None, fix_kf: bool = False
 ) -> vs.VideoNode:
     """
     Stronger version of `deblend` that uses a bobbed clip to deblend. Adopted from jvsfunc.
 
+    Producing a good bob is usually the most expensive part of this. With ``fields``, the output of
+    ``SeparateFields`` is passed instead: the second fields are shifted to the lines of the first ones,
+    the deblending is done at field resolution, and the deblended fields are then interpolated to full height.
+    When a fieldmatched clip is given, only the frames it selects are deblended and interpolated.
+
+    .. code-block:: python
+
+        >>> deblend_bob(src.std.SeparateFields(tff=True), vfm(src), fields=True)
+
     :param bobbed:          Bobbed source or a tuple of even/odd fields.
+                            With ``fields``, the source after ``SeparateFields``, or a tuple of its even/odd fields.
     :param fieldmatched:    Source after field matching, must have field=3 and possibly low cthresh.
+    :param fields:          Deblend the separated fields instead of a bobbed clip.
+    :param interpolate:     Function interpolating the deblended fields to full height.
+                            The fields have the ``_Field`` property of the first field of every frame.
+                            Default: bicubic upscale with the field shift.
+    :param fix_kf:          Fix the blended keyframes in the same selection as the pattern.
+                            Equivalent to :py:func:`deblend_fix_kf` on the output. Requires ``fieldmatched``.
 
     :return: Deblended clip.
     """
 
+    if fix_kf and not fieldmatched:
+        raise CustomValueError('The keyframe fix requires a fieldmatched clip!', deblend_bob)
+
     if isinstance(bobbed, tuple):
         bob0, bob1 = bobbed
     else:
         bob0, bob1 = bobbed.std.SelectEvery(2, 0), bobbed.std.SelectEvery(2, 1)
 
+    tff = True
+
+    if fields:
+        tff = get_prop(bob0.get_frame(0), '_Field', int, default=1) == 1
+
+        # Move the second fields to the lines of the first ones, half a field line away
+        bob1 = bob1.resize.Bicubic(src_top=-0.5 if tff else 0.5)
+
     ab0, bc0, c0 = shift_clip_multi(bob0, (0, 2))
     bc1, ab1, a1 = shift_clip_multi(bob1)
 
     deblended = norm_expr([a1, ab1, ab0, bc1, bc0, c0], ('b', 'y x - z + b c - a + + 2 /'))
 
+    if fields:
+        deblended = deblended.std.SetFrameProps(_Field=int(tff))
+
+        if interpolate:
+            deblended = interpolate(deblended)
+        else:
+            deblended = deblended.resize.Bicubic(height=deblended.height * 2, src_top=0.25 if tff else -0.25)
+
+        deblended = FieldBased.PROGRESSIVE.apply(deblended.std.RemoveFrameProps('_Field'))
+
     if fieldmatched:
-        return deblending_helper(fieldmatched, deblended)
+        return deblending_helper(deblended, fieldmatched, fix_kf=fix_kf)
 
     return deblended
 
 
+@instrumented
 def deblend_fix_kf(deblended: vs.VideoNode, fieldmatched: vs.VideoNode) -> vs.VideoNode:
     """
     Should be used after deblend/_bob to fix scene changes. Adopted from jvsfunc.
 
+    Passing ``fix_kf=True`` to :py:func:`deblend`, :py:func:`deblend_bob` or :py:func:`deblending_helper`
+    does the same in a single selection, without stacking a second selector.
+
     :param deblended:       Deblended clip.
     :param fieldmatched:    Fieldmatched clip used to debled, must have field=3 and possibly low cthresh.
 
@@ -121,12 +262,8 @@ def deblend_fix_kf(deblended: vs.VideoNode, fieldmatched: vs.VideoNode) -> vs.Vi
     shifted_clips = shift_clip_multi(deblended)
     prop_srcs = shift_clip_multi(fieldmatched, (0, 1))
 
-    if complexpr_available:
-        index_src = expr_func(
-            prop_srcs, 'x._Combed x.VFMSceneChange and y.VFMSceneChange 2 0 ? 1 ?', vs.GRAY8
-        )
-
-        return deblended.std.FrameEval(lambda n, f: shifted_clips[f[0][0, 0]], index_src)  # type: ignore
+    if _select_available():
+        return core.akarin.Select(shifted_clips, prop_srcs, 'x._Combed x.VFMSceneChange and y.VFMSceneChange 2 0 ? 1 ?')
 
     def _keyframe_fix(n: int, f: list[vs.VideoFrame]) -> vs.VideoNode:
         keyfm = cast(tuple[int, int], (f[0].props.VFMSceneChange, f[1].props.VFMSceneChange))
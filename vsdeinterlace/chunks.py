@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Callable, Sequence
+
+from vstools import CustomValueError, vs
+
+from .blending import deblend, deblend_bob, deblend_fix_kf, deblending_helper
+from .funcs import vinverse
+from .ivtc import IVTCycles, PulldownCycle, jivtc, sivtc, vdecimate, vfm
+
+__all__ = [
+    'ChunkSplit',
+
+    'chunk_overlap', 'split_chunks'
+]
+
+
+_overlaps: dict[Callable[..., vs.VideoNode], tuple[int, int]] = {
+    vfm: (1, 1),
+    vdecimate: (1, 0),
+    deblend: (1, 2),
+    deblend_bob: (1, 2),
+    deblending_helper: (0, 1),
+    deblend_fix_kf: (1, 2),
+    vinverse: (0, 0),
+    sivtc: (0, 1),
+    jivtc: (1, 2),
+}
+
+# The keyframe fix selects the pattern frame of the previous or next frame, widening the window by one on each side
+_fix_kf_overlaps: dict[Callable[..., vs.VideoNode], tuple[int, int]] = {
+    deblend: (2, 3),
+    deblend_bob: (2, 3),
+    deblending_helper: (1, 2),
+}
+
+
+def chunk_overlap(*funcs: Callable[..., vs.VideoNode], fix_kf: bool = False) -> tuple[int, int]:
+    """
+    Get the number of frames before and after a chunk needed to render it exactly like a single pass would.
+
+    :param funcs:       Functions of the pipeline, in any order.
+    :param fix_kf:      Whether the deblending functions are called with ``fix_kf=True``.
+
+    :return:            Frames needed before and after the chunk.
+    """
+
+    overlaps = _overlaps | _fix_kf_overlaps if fix_kf else _overlaps
+
+    before, after = 0, 0
+
+    for func in funcs:
+        if func not in overlaps:
+            raise CustomValueError('Unknown temporal window for {func}!', chunk_overlap, func=func)
+
+        before, after = before + overlaps[func][0], after + overlaps[func][1]
+
+    return before, after
+
+
+@dataclass
+class ChunkSplit:
+    """Range of source frames a worker is responsible for, with the context it needs to render it."""
+
+    start: int
+    """First source frame of the chunk."""
+
+    end: int
+    """Source frame after the last one of the chunk."""
+
+    before: int
+    """Context frames rendered before ``start``. Always a multiple of the cycle."""
+
+    after: int
+    """Context frames rendered after ``end``."""
+
+    def source(self, clip: vs.VideoNode) -> vs.VideoNode:
+        """Trim the source clip to the frames this chunk has to render, context included."""
+
+        return clip[self.start - self.before:self.end + self.after]
+
+    def trim(self, processed: vs.VideoNode, rate: Fraction | int = 1) -> vs.VideoNode:
+        """
+        Remove the context frames from a processed chunk.
+
+        :param processed:   Output of the pipeline run on :py:meth:`source`.
+        :param rate:        Ratio of output frames to source frames of the pipeline,
+                            e.g. ``Fraction(4, 5)`` after decimation.
+
+        :return:            Frames owned by this chunk.
+        """
+
+        start = Fraction(self.before * rate)
+
+        if start.denominator != 1:
+            raise CustomValueError('The rate doesn\'t map the context to whole frames!', self.trim, rate)
+
+        if not self.after:
+            return processed[int(start):]
+
+        return processed[int(start):int(start + (self.end - self.start) * rate)]
+
+
+def split_chunks(
+    num_frames: int | vs.VideoNode, chunks: int,
+    cycle: int | IVTCycles | PulldownCycle = 5, overlap: tuple[int, int] = (0, 0),
+    scenechanges: Sequence[int] | None = None, search: int | None = None
+) -> list[ChunkSplit]:
+    """
+    Split a clip in chunks that can be rendered in parallel and concatenated into the same output as a single run.
+
+    Chunk boundaries are placed on multiples of the decimation cycle so that neither ``vdecimate`` cycles
+    nor ``IVTCycles`` patterns are broken. If scene changes are given, every boundary is moved
+    to the cycle boundary closest to a scene change near the ideal position.
+
+    Each chunk carries enough context before and after itself for the temporal windows of the pipeline,
+    rounded up to whole cycles so that decimated outputs can be trimmed exactly.
+
+    .. code-block:: python
+
+        >>> splits = split_chunks(src, 8, overlap=chunk_overlap(vfm, deblend, vdecimate))
+        >>> # In worker i
+        >>> out = splits[i].trim(vdecimate(deblend(splits[i].source(src), ...)), Fraction(4, 5))
+
+    :param num_frames:      Clip or its number of frames.
+    :param chunks:          Number of chunks to split into.
+    :param cycle:           Decimation cycle, in source frames. An :py:class:`IVTCycles` or :py:class:`PulldownCycle`
+                            uses its cycle length.
+                            When sections with different cycles are chained, pass the least common multiple.
+    :param overlap:         Frames of context needed before and after a chunk. See :py:func:`chunk_overlap`.
+    :param scenechanges:    Optional scene change frames to align the boundaries to.
+    :param search:          How far from the ideal position a scene change can be. Default: a tenth of a chunk.
+
+    :return:                List of chunks, covering the whole clip in order.
+    """
+
+    if isinstance(num_frames, vs.VideoNode):
+        num_frames = num_frames.num_frames
+
+    if isinstance(cycle, (IVTCycles, PulldownCycle)):
+        cycle = cycle.length
+
+    if chunks < 1 or num_frames < chunks * cycle:
+        raise CustomValueError('Too many chunks for this clip!', split_chunks, chunks)
+
+    size = num_frames / chunks
+    search = round(size / 10) if search is None else search
+    scenes = sorted(set(scenechanges or []))
+
+    bounds = [0]
+
+    for i in range(1, chunks):
+        ideal = round(i * size)
+
+        near = scenes[bisect_left(scenes, ideal - search):bisect_right(scenes, ideal + search)]
+
+        if near:
+            ideal = min(near, key=lambda s: abs(s - ideal))
+
+        bound = round(ideal / cycle) * cycle
+
+        if bounds[-1] < bound < num_frames:
+            bounds.append(bound)
+
+    bounds.append(num_frames)
+
+    before, after = (-(-max(o, 0) // cycle) * cycle for o in overlap)
+
+    return [
+        ChunkSplit(start, end, min(before, start), min(after, num_frames - end))
+        for start, end in zip(bounds, bounds[1:])
+    ]
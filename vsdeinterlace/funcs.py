@@ -11,6 +11,8 @@ from vstools import (
     InvalidFramerateError, PlanesT, check_variable, core, scale_delta, vs
 )
 
+from .instrument import instrumented
+
 __all__ = [
     'telop_resample',
     'fix_interlaced_fades',
@@ -23,6 +25,7 @@ class telop_resample(CustomIntEnum):
     TXT60i_on_24duped = 1
     TXT30p_on_24telecined = 2
 
+    @instrumented
     def __call__(self, bobbed_clip: vs.VideoNode, pattern: int, **mv_args: Any) -> vs.VideoNode:
         """
         Virtually oversamples the video to 120 fps with motion interpolation on credits only, and decimates to 24 fps.
@@ -147,6 +150,7 @@ class FixInterlacedFades(CustomEnum):
     Darken: FixInterlacedFades = object()  # type: ignore
     Brighten: FixInterlacedFades = object()  # type: ignore
 
+    @instrumented
     def __call__(
         self, clip: vs.VideoNode, colors: float | list[float] | PlanesT = 0.0,
         planes: PlanesT = None, func: FuncExceptT | None = None
@@ -212,6 +216,7 @@ class FixInterlacedFades(CustomEnum):
         return f.return_clip(fix)
 
 
+@instrumented
 def vinverse(
     clip: vs.VideoNode,
     comb_blur: GenericVSFunction | vs.VideoNode = BlurMatrix.BINOMIAL(mode=ConvMode.VERTICAL),
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from types import TracebackType
+from typing import Any, Callable, TypeVar
+
+from vstools import SPathLike, vs
+
+__all__ = [
+    'StageStats', 'PipelineStats',
+
+    'instrumented'
+]
+
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+_active = list['PipelineStats']()
+
+
+@dataclass
+class StageStats:
+    """Timings of the frames of a single stage of a pipeline."""
+
+    name: str
+    """Name of the stage."""
+
+    requests: int = 0
+    """Number of frame requests to the stage, including the ones made again after a cache miss."""
+
+    frames: int = 0
+    """Number of frames the stage returned."""
+
+    cumulative: float = 0.0
+    """
+    Sum of the time between the request and the delivery of every frame, in seconds.
+    This includes the time spent in the stages before this one.
+    """
+
+    first_request: float | None = field(default=None, repr=False)
+    last_ready: float | None = field(default=None, repr=False)
+
+    @property
+    def wall(self) -> float:
+        """Time between the first request and the last frame delivered, in seconds."""
+
+        if self.first_request is None or self.last_ready is None:
+            return 0.0
+
+        return self.last_ready - self.first_request
+
+    @property
+    def latency(self) -> float:
+        """Average time to deliver a frame, in seconds."""
+
+        return self.cumulative / self.frames if self.frames else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            name: value for name, value in asdict(self).items() if name not in ('first_request', 'last_ready')
+        } | dict(wall=self.wall, latency=self.latency)
+
+
+class PipelineStats:
+    """
+    Opt-in instrumentation of the vsdeinterlace functions.
+
+    While the context is active, the clip returned by every instrumented function is wrapped
+    so that its frame requests and their timings are recorded as a stage.
+    The clips are only timed when they are rendered, which can happen after the context has been left.
+
+    .. code-block:: python
+
+        >>> with PipelineStats() as stats:
+        ...     clip = vdecimate(deblend(src, vfm(src)))
+        >>> clip.output(...)
+        >>> print(stats)
+        >>> stats.dump('timings.json')
+
+    Stages are timed from the request of a frame to its delivery, so the time of every stage
+    includes the time of the stages it requested frames from.
+    """
+
+    stages: dict[str, StageStats]
+    """Stats of every stage, in the order they were created."""
+
+    def __init__(self) -> None:
+        self.stages = {}
+
+        self._lock = Lock()
+
+    def __enter__(self) -> PipelineStats:
+        _active.append(self)
+
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        _active.remove(self)
+
+    def wrap(self, clip: vs.VideoNode, name: str) -> vs.VideoNode:
+        """
+        Time the frames of a clip as a new stage.
+
+        :param clip:        Clip to time.
+        :param name:        Name of the stage. A number is appended if it's already taken.
+
+        :return:            Clip returning the same frames.
+        """
+
+        with self._lock:
+            index, stage_name = 1, name
+
+            while stage_name in self.stages:
+                index += 1
+                stage_name = f'{name}#{index}'
+
+            stage = self.stages[stage_name] = StageStats(stage_name)
+
+        pending = dict[int, list[float]]()
+
+        def _request(n: int) -> vs.VideoNode:
+            now = perf_counter()
+
+            with self._lock:
+                stage.requests += 1
+
+                if stage.first_request is None:
+                    stage.first_request = now
+
+                pending.setdefault(n, []).append(now)
+
+            return clip
+
+        def _ready(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+            now = perf_counter()
+
+            with self._lock:
+                requested = pending.get(n)
+
+                if requested:
+                    stage.cumulative += now - requested.pop(0)
+
+                stage.frames += 1
+                stage.last_ready = now
+
+            return f
+
+        timed = clip.std.FrameEval(_request)
+
+        return timed.std.ModifyFrame(timed, _ready)
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        return {name: stage.as_dict() for name, stage in self.stages.items()}
+
+    def dump(self, path: SPathLike | None = None) -> str:
+        """
+        Get the stats as JSON.
+
+        :param path:    Optional file to write the JSON to.
+
+        :return:        JSON string.
+        """
+
+        text = json.dumps(self.as_dict(), indent=2)
+
+        if path is not None:
+            with open(path, 'w') as file:
+                file.write(text + '\n')
+
+        return text
+
+    def __str__(self) -> str:
+        lines = [f'{"stage":<28}{"requests":>10}{"frames":>10}{"wall (s)":>12}{"total (s)":>12}{"avg (ms)":>10}']
+
+        lines += [
+            f'{stage.name:<28}{stage.requests:>10}{stage.frames:>10}'
+            f'{stage.wall:>12.3f}{stage.cumulative:>12.3f}{stage.latency * 1000:>10.2f}'
+            for stage in self.stages.values()
+        ]
+
+        return '\n'.join(lines)
+
+
+def instrumented(func: F) -> F:
+    """
+    Time the clip returned by a function as a stage of every active :py:class:`PipelineStats`.
+
+    Without an active context, the function is called as is.
+    """
+
+    name = func.__qualname__.removesuffix('.__call__')
+
+    @wraps(func)
+    def _wrapper(*args: Any, **kwargs: Any) -> Any:
+        out = func(*args, **kwargs)
+
+        if isinstance(out, vs.VideoNode):
+            for stats in _active:
+                out = stats.wrap(out, name)
+
+        return out
+
+    return _wrapper  # type: ignore[return-value]
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
-from typing import Any
+from abc import abstractmethod
+from array import array
+from bisect import bisect_right
+from contextlib import nullcontext
+from fractions import Fraction
+from math import ceil
+from typing import Any, Callable, Mapping, Sequence
 
 from vstools import (
-    CustomEnum, CustomIntEnum, FieldBased, FieldBasedT,
-    FunctionUtil, InvalidFramerateError, VSFunctionKwArgs,
-    VSFunctionNoArgs, core, find_prop_rfs, join, vs
+    CustomEnum, CustomIntEnum, CustomValueError, FieldBased, FieldBasedT, FuncExceptT,
+    FunctionUtil, InvalidFramerateError, SPath, SPathLike, VSFunctionKwArgs,
+    VSFunctionNoArgs, clip_async_render, core, depth, find_prop_rfs, get_y, join, replace_ranges, shift_clip, vs
 )
 
 from .blending import deblend
+from .instrument import instrumented
+from .postprocess import TieredPostprocess
+from .stats import DecimationPlan, VDecimateStats, VFMCache, VFMStats, VFRTimecodes
+from .telecine import parse_pulldown
+from .utils import detect_field_order
 
 __all__ = [
-    'IVTCycles',
+    'IVTCycles', 'PulldownCycle',
     'sivtc', 'jivtc',
+    'find_ivtc_patterns',
     'vfm', 'VFMMode',
     'vdecimate'
 ]
@@ -49,7 +61,66 @@ class VFMMode(CustomIntEnum):
     """
 
 
-class IVTCycles(list[int], CustomEnum):
+class _CycleDecimation:
+    value: list[list[int]]
+
+    @property
+    @abstractmethod
+    def pattern_length(self) -> int:
+        """Number of frames of the double-weaved clip in a cycle."""
+
+    @property
+    def length(self) -> int:
+        """Number of patterns of the cycle."""
+
+        return len(self.value)
+
+    def frame_map(
+        self, num_frames: int, pattern: int | Mapping[int, int] = 0, span: int | Fraction | None = None
+    ) -> array[int]:
+        """
+        Compute the input frame of every output frame of :py:meth:`decimate`.
+
+        :param num_frames:  Number of frames of the clip to decimate.
+        :param pattern:     Pattern, or mapping of the first source frame of every section to its pattern.
+                            A cycle uses the pattern of the section its middle frame belongs to,
+                            so changes take effect at the cycle boundary closest to the section start.
+        :param span:        Number of source frames a cycle of the decimated clip covers,
+                            to place the sections of ``pattern``.
+                            Default: :py:attr:`length`, as when decimating the double-weaved source.
+
+        :return:            Frame map.
+        """
+
+        patterns = {0: pattern} if isinstance(pattern, int) else dict(pattern)
+
+        assert patterns and all(0 <= p < self.length for p in patterns.values())
+
+        span = self.length if span is None else span
+
+        starts = sorted(patterns)
+
+        frame_map = array('i')
+
+        for cycle in range(ceil(num_frames / self.pattern_length)):
+            idx = bisect_right(starts, (cycle + Fraction(1, 2)) * span) - 1
+            base = cycle * self.pattern_length
+
+            frame_map.extend(
+                base + offset for offset in self.value[patterns[starts[max(idx, 0)]]] if base + offset < num_frames
+            )
+
+        return frame_map
+
+    def decimate(self, clip: vs.VideoNode, pattern: int | Mapping[int, int] = 0) -> vs.VideoNode:
+        if isinstance(pattern, int):
+            assert 0 <= pattern < self.length
+            return clip.std.SelectEvery(self.pattern_length, self.value[pattern])
+
+        return DecimationPlan.from_cycles(self, clip.num_frames, pattern).apply(clip)
+
+
+class IVTCycles(_CycleDecimation, list[int], CustomEnum):
     cycle_10 = [[0, 3, 6, 8], [0, 2, 5, 8], [0, 2, 4, 7], [2, 4, 6, 9], [1, 4, 6, 8]]
     cycle_08 = [[0, 3, 4, 6], [0, 2, 5, 6], [0, 2, 4, 7], [0, 2, 4, 7], [1, 2, 4, 6]]
     cycle_05 = [[0, 1, 3, 4], [0, 1, 2, 4], [0, 1, 2, 3], [1, 2, 3, 4], [0, 2, 3, 4]]
@@ -58,27 +129,91 @@ class IVTCycles(list[int], CustomEnum):
     def pattern_length(self) -> int:
         return int(self._name_[6:])
 
+    @staticmethod
+    def from_pulldown(pulldown: str | Sequence[int]) -> PulldownCycle:
+        """
+        Build the cycle reversing any pulldown cadence. See :py:class:`PulldownCycle`.
+
+        .. code-block:: python
+
+            >>> sivtc(clip, 0, ivtc_cycle=IVTCycles.from_pulldown('2:3:3:2'))
+        """
+
+        return PulldownCycle(pulldown)
+
+
+class PulldownCycle(_CycleDecimation):
+    """
+    Decimation cycle of a pulldown cadence, to use like :py:class:`IVTCycles` on a double-weaved clip.
+
+    For every film frame of the cadence, the cycle selects the weave of two of its fields,
+    preferring the even weaves which are frames of the telecined clip.
+    The cadence is repeated until it spans an even number of fields,
+    and every pattern shifts it by one frame of the telecined clip, i.e. two fields.
+
+    ``IVTCycles.from_pulldown('3:2')`` gives the same cycles as ``IVTCycles.cycle_10``,
+    and ``sivtc(telecine(film, pulldown, phase=phase), -phase // 2 % cycle.length, ivtc_cycle=cycle)``
+    returns the film frames for even phases, except for a first frame left with a single field.
+    """
+
+    cadence: list[int]
+    """Fields of every film frame over a cycle."""
+
+    def __init__(self, pulldown: str | Sequence[int]) -> None:
+        """
+        :param pulldown:    Pulldown cadence, like ``'2:3:3:2'`` or ``'2:2:2:4'``. See :py:func:`parse_pulldown`.
+        """
+
+        cadence = parse_pulldown(pulldown, self.__class__)
+
+        if 1 in cadence:
+            raise CustomValueError(
+                'Film frames shown for a single field can\'t be recovered by frame selection!', self.__class__, pulldown
+            )
+
+        self.cadence = cadence * (1 + sum(cadence) % 2)
+
+        fields = sum(self.cadence)
+        starts = [sum(self.cadence[:i]) for i in range(len(self.cadence))]
+
+        self.value = [
+            sorted(self._pick(start + 2 * phase, count) % fields for start, count in zip(starts, self.cadence))
+            for phase in range(fields // 2)
+        ]
+
+    @staticmethod
+    def _pick(start: int, count: int) -> int:
+        weaves = range(start, start + count - 1)
+
+        return next((n for n in weaves if n % 2 == 0), start)
+
     @property
-    def length(self) -> int:
-        return len(self.value)
+    def pattern_length(self) -> int:
+        return sum(self.cadence)
 
-    def decimate(self, clip: vs.VideoNode, pattern: int = 0) -> vs.VideoNode:
-        assert 0 <= pattern < self.length
-        return clip.std.SelectEvery(self.pattern_length, self.value[pattern])
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({":".join(map(str, self.cadence))!r})'
 
 
+@instrumented
 def sivtc(
-    clip: vs.VideoNode, pattern: int = 0, tff: bool | FieldBasedT = True, ivtc_cycle: IVTCycles = IVTCycles.cycle_10
+    clip: vs.VideoNode, pattern: int | Mapping[int, int] = 0, tff: bool | FieldBasedT = True,
+    ivtc_cycle: IVTCycles | PulldownCycle = IVTCycles.cycle_10
 ) -> vs.VideoNode:
     """
     Simplest form of a fieldmatching function.
 
     This is essentially a stripped-down JIVTC offering JUST the basic fieldmatching and decimation part.
-    As such, you may need to combine multiple instances if patterns change throughout the clip.
+    If the pattern changes throughout the clip, pass a mapping of the first frame of every section
+    to its pattern, for example the output of :py:func:`find_ivtc_patterns`.
+    The whole clip is then decimated with a single frame remap.
 
     :param clip:        Clip to process.
-    :param pattern:     First frame of any clean-combed-combed-clean-clean sequence.
+    :param pattern:     First frame of any clean-combed-combed-clean-clean sequence,
+                        or a mapping of the first frame of every section to its pattern.
     :param tff:         Top-Field-First.
+    :param ivtc_cycle:  Decimation cycle. Other pulldown cadences than 3:2 can be reversed
+                        with a cycle from :py:meth:`IVTCycles.from_pulldown`.
 
     :return:            IVTC'd clip.
     """
@@ -91,8 +226,9 @@ def sivtc(
     return FieldBased.PROGRESSIVE.apply(ivtc)
 
 
+@instrumented
 def jivtc(
-    src: vs.VideoNode, pattern: int, tff: bool = True, chroma_only: bool = True,
+    src: vs.VideoNode, pattern: int | Mapping[int, int], tff: bool = True, chroma_only: bool = True,
     postprocess: VSFunctionKwArgs = deblend, postdecimate: IVTCycles | None = IVTCycles.cycle_05,
     ivtc_cycle: IVTCycles = IVTCycles.cycle_10, final_ivtc_cycle: IVTCycles = IVTCycles.cycle_08,
     **kwargs: Any
@@ -102,7 +238,8 @@ def jivtc(
     You can disable chroma_only to use in luma as well, but it is not recommended.
 
     :param src:             Source clip. Has to be 60i.
-    :param pattern:         First frame of any clean-combed-combed-clean-clean sequence.
+    :param pattern:         First frame of any clean-combed-combed-clean-clean sequence,
+                            or a mapping of the first frame of every section to its pattern.
     :param tff:             Set top field first (True) or bottom field first (False).
     :param chroma_only:     Decide whether luma too will be processed.
     :param postprocess:     Function to run after second decimation. Should be either a bobber or a deblender.
@@ -113,27 +250,132 @@ def jivtc(
 
     InvalidFramerateError.check(jivtc, src, (30000, 1001))
 
-    ivtced = core.std.SeparateFields(src, tff=tff).std.DoubleWeave()
-    ivtced = ivtc_cycle.decimate(ivtced, pattern)
+    woven = core.std.SeparateFields(src, tff=tff).std.DoubleWeave()
 
-    pprocess = postprocess(src if postdecimate else ivtced, **kwargs)
+    ivtc_plan = DecimationPlan.from_cycles(ivtc_cycle, woven.num_frames, pattern)
+    ivtced = ivtc_plan.apply(woven)
 
     if postdecimate:
-        pprocess = postdecimate.decimate(pprocess, pattern)
+        pprocess = postprocess(src, **kwargs)
+        pprocess_plan = DecimationPlan.from_cycles(postdecimate, pprocess.num_frames, pattern)
+    else:
+        pprocess = postprocess(ivtced, **kwargs)
+        pprocess_plan = DecimationPlan(range(pprocess.num_frames))
+
+    # The final decimation picks from the interleaved ivtced/pprocess clips,
+    # so its frame map is composed with theirs to fetch every frame directly from the sources.
+    # A cycle of the interleaved clip covers half as many ivtced frames, which each cover 1 / rate source frames
+    final_plan = DecimationPlan.from_cycles(
+        final_ivtc_cycle, 2 * min(len(ivtc_plan), len(pprocess_plan)), pattern,
+        Fraction(final_ivtc_cycle.pattern_length, 2) / (2 * Fraction(ivtc_plan.rate or 1))
+    )
+
+    final_map = [
+        ivtc_plan[i // 2] if i % 2 == 0 else woven.num_frames + pprocess_plan[i // 2]
+        for i in final_plan.frame_map
+    ]
+
+    fps = ivtced.fps * 2 * Fraction(len(final_ivtc_cycle.value[0]), final_ivtc_cycle.pattern_length)
 
-    inter = core.std.Interleave([ivtced, pprocess])
-    final = final_ivtc_cycle.decimate(inter, pattern)
+    final = DecimationPlan(final_map).apply(core.std.Splice([woven, pprocess], True))
+    final = final.std.AssumeFPS(fpsnum=fps.numerator, fpsden=fps.denominator)
 
     final = join(ivtced, final) if chroma_only else final
 
     return FieldBased.ensure_presence(final, FieldBased.PROGRESSIVE)
 
 
+def find_ivtc_patterns(
+    clip: vs.VideoNode, scenes: Sequence[int] | None = None, scene_thr: float = 0.1, min_length: int = 10,
+    margin: float = 0.05, progress: str | Callable[[int, int], None] | None = None
+) -> dict[int, int]:
+    """
+    Find the ``pattern`` to pass to :py:func:`sivtc` and :py:func:`jivtc` for every scene of a 3:2 telecined clip.
+
+    Every frame gets a cheap combing score, the ratio between its inter-field and intra-field vertical detail,
+    and a scene change metric, all collected in a single render of the clip.
+    Each phase of the cycle is then scored per scene from the average combing
+    at the positions it expects to be combed versus the ones it expects to be clean.
+
+    The scores of the phases always sum to zero, so a phase is only accepted if it stands out from the second best one.
+    Scenes without any detectable cadence (static or progressive ones) inherit the pattern of the previous scene.
+
+    :param clip:        Telecined clip to analyse.
+    :param scenes:      First frame of every scene. If None, scene changes are detected from frame differences.
+    :param scene_thr:   Normalized frame difference above which a frame is considered a scene change.
+    :param min_length:  Scenes shorter than this are merged into the previous one.
+    :param margin:      Minimum difference between the scores of the best and the second best phases,
+                        relative to the mean combing score of the scene, for the best phase to be picked.
+    :param progress:    Progress message or callback passed to the renderer.
+
+    :return:            Mapping of the first frame of every section to its pattern.
+    """
+
+    luma = get_y(clip)
+
+    comb = luma.std.Convolution([1, -2, 1], mode='v', saturate=False).std.PlaneStats(prop='Comb')
+    field = luma.std.Convolution([1, 0, -2, 0, 1], mode='v', saturate=False).std.PlaneStats(prop='Field')
+
+    metrics = comb.std.CopyFrameProps(field, ['FieldAverage'])
+
+    if scenes is None:
+        metrics = metrics.std.CopyFrameProps(
+            luma.std.PlaneStats(shift_clip(luma, -1), prop='Scene'), ['SceneDiff']
+        )
+
+    frames = clip_async_render(
+        metrics, None, progress, lambda n, f: (
+            f.props.CombAverage / (f.props.FieldAverage + 1e-6), f.props.get('SceneDiff', 0.0)
+        )
+    )
+
+    if scenes is None:
+        scenes = [n for n, (_, diff) in enumerate(frames) if diff > scene_thr]
+
+    starts = [0]
+
+    for start in sorted(set(scenes)):
+        if start - starts[-1] >= min_length and clip.num_frames - start >= min_length:
+            starts.append(start)
+
+    length = IVTCycles.cycle_10.length
+
+    patterns = dict[int, int]()
+    pattern = 0
+
+    for start, end in zip(starts, starts[1:] + [clip.num_frames]):
+        sums, counts = [0.0] * length, [0] * length
+
+        for n in range(start, end):
+            sums[n % length] += frames[n][0]
+            counts[n % length] += 1
+
+        means = [total / max(count, 1) for total, count in zip(sums, counts)]
+
+        scores = [
+            sum(means[(p + i) % length] for i in (1, 2)) / 2
+            - sum(means[(p + i) % length] for i in (0, 3, 4)) / 3
+            for p in range(length)
+        ]
+
+        best, second = sorted(scores, reverse=True)[:2]
+
+        if best - second > margin * sum(means) / length:
+            pattern = scores.index(best)
+
+        if not patterns or patterns[max(patterns)] != pattern:
+            patterns[start] = pattern
+
+    return patterns
+
+
+@instrumented
 def vfm(
     clip: vs.VideoNode, tff: FieldBasedT | None = None,
-    mode: VFMMode = VFMMode.TWO_WAY_MATCH_THIRD_COMBED,
-    postprocess: vs.VideoNode | VSFunctionNoArgs | None = None,
-    **kwargs: Any
+    mode: VFMMode | Sequence[VFMMode] = VFMMode.TWO_WAY_MATCH_THIRD_COMBED,
+    postprocess: vs.VideoNode | VSFunctionNoArgs | TieredPostprocess | None = None,
+    stats: VFMStats | VFMCache | SPathLike | None = None,
+    analysis: bool | int = False, **kwargs: Any
 ) -> vs.VideoNode:
     """
     Perform field matching using VFM.
@@ -151,14 +393,52 @@ def vfm(
         # Run vsaa.Nnedi3 on combed frames
         >>> vfm(clip, postprocess=lambda x: Nnedi3().interpolate(x, double_y=False))
 
+    The matching decisions can be stored in a stats file and replayed on later runs without running VFM again.
+    On the first run the VFM clip is rendered once to collect them.
+
+    .. code-block:: python
+
+        # First run analyses and writes the file, later runs only read it
+        >>> vfm(clip, stats='episode01.vfm')
+
+    Passing several modes runs them as a cascade: the first mode matches the whole clip,
+    and every following mode is only run on the frames that are still combed after the previous ones.
+    This gives the matches of the higher modes at roughly the cost of the cheapest one on clean material.
+
+    .. code-block:: python
+
+        >>> vfm(clip, mode=[VFMMode.TWO_WAY_MATCH, VFMMode.THREE_WAY_MATCH_FOURTH_FIFTH])
+
+    On high bit depth or UHD sources, most of the cost of VFM is the conversion of the whole clip
+    to 8 bits just to compute the metrics. With ``analysis``, the metrics are computed on the luma only,
+    optionally downscaled field by field, and the matched fields are copied from the untouched source.
+
+    .. code-block:: python
+
+        # Compute the metrics on a GRAY8 clip at half the size
+        >>> vfm(clip, analysis=2)
+
     :param clip:            Input clip to field matching telecine on.
     :param tff:             Field order of the input clip.
-                            If None, it will be automatically detected.
+                            If None, it's read from the clip, or detected from a few sampled frames
+                            with :py:func:`detect_field_order` if the clip isn't tagged as interlaced.
     :param mode:            VFM matching mode. For more information, see :py:class:`VFMMode`.
+                            If a sequence is passed, the modes are tried in order on frames still flagged as combed.
                             Default: VFMMode.TWO_WAY_MATCH_THIRD_COMBED.
     :param postprocess:     Optional function or clip to process combed frames.
                             If a function is passed, it should take a clip as input and return a clip as output.
                             If a clip is passed, it will be used as the postprocessed clip.
+                            A :py:class:`TieredPostprocess` picks between several filters depending on the mics
+                            of every combed frame.
+    :param stats:           Two-pass mode. Either a :py:class:`VFMStats` object to replay,
+                            or a path to a stats file. If the file exists, its matches are replayed,
+                            otherwise VFM is run, its decisions and mics are written to the file and then replayed.
+                            A :py:class:`VFMCache` works the same way, but only analyses the frames
+                            missing from a cache shared by every script using the same source and parameters.
+    :param analysis:        Compute the VFM metrics on a GRAY8 clip instead of an 8-bit copy of the input.
+                            If an int is passed, it is a power of two the fields are downscaled by,
+                            and the block sizes, ``y`` and ``mi`` are scaled accordingly.
+                            Default: False (the metrics are computed on the whole input).
     :param kwargs:          Additional keyword arguments to pass to VFM.
                             For a list of parameters, see the VIVTC documentation.
 
@@ -167,10 +447,22 @@ def vfm(
 
     func = FunctionUtil(clip, vfm, None, (vs.YUV, vs.GRAY), 8)
 
+    if stats is not None and not isinstance(stats, (VFMStats, VFMCache)) and SPath(stats).exists():
+        stats = VFMStats.load(stats, func.func)
+
+    # Replayed stats carry their own field order, so the detection is only needed when VFM runs
+    if tff is None and not isinstance(stats, VFMStats) and not FieldBased.from_video(clip, False, func.func).is_inter:
+        tff, _ = detect_field_order(clip)
+
     tff = FieldBased.from_param_or_video(tff, clip, False, func.func)
 
+    modes = [mode] if isinstance(mode, int) else list(mode)
+
+    if not modes:
+        raise CustomValueError('You must pass at least one mode!', func.func, mode)
+
     vfm_kwargs = dict[str, Any](
-        order=tff.is_tff, mode=mode
+        order=tff.is_tff, mode=modes[0]
     )
 
     if block := kwargs.pop('block', None):
@@ -182,30 +474,150 @@ def vfm(
     if (y := kwargs.pop('y', None)) and not isinstance(y, int):
         vfm_kwargs |= dict(y0=y[0], y1=y[1])
 
-    if not kwargs.get('clip2', None) and func.work_clip.format is not clip.format:
-        vfm_kwargs |= dict(clip2=clip)
+    if analysis:
+        factor = _analysis_factor(analysis, func.func)
+
+        work_clip = _analysis_clip(clip, factor, tff)
+
+        vfm_kwargs |= dict(clip2=clip, chroma=False)
+
+        if factor > 1:
+            params = vfm_kwargs | kwargs
+
+            kwargs |= dict(
+                blockx=max(params.get('blockx', 16) // factor, 4),
+                blocky=max(params.get('blocky', 16) // factor, 4),
+                mi=max(params.get('mi', 80) // factor ** 2, 1)
+            )
+
+            if 'y0' in params:
+                kwargs |= dict(y0=params['y0'] // factor, y1=params['y1'] // factor)
+    else:
+        work_clip = func.work_clip
+
+        if not kwargs.get('clip2', None) and work_clip.format is not clip.format:
+            vfm_kwargs |= dict(clip2=clip)
+
+    if isinstance(postprocess, TieredPostprocess) or (stats is not None and not isinstance(stats, VFMStats)):
+        # The tiers are picked from the mics, and the stats store them so that they can drive the tiers too
+        vfm_kwargs |= dict(micout=1)
+
+    out_clip = kwargs.get('clip2', clip)
+
+    def _field_match() -> vs.VideoNode:
+        fieldmatch = work_clip.vivtc.VFM(**(vfm_kwargs | kwargs))
+
+        # VFM matches every frame on its own, so the frames of the next modes are only requested where needed
+        for next_mode in modes[1:]:
+            fieldmatch = find_prop_rfs(
+                fieldmatch, work_clip.vivtc.VFM(**(vfm_kwargs | kwargs | dict(mode=next_mode))),
+                '_Combed', '==', 1
+            )
+
+        return fieldmatch
+
+    vfm_stats: VFMStats | None = None
+
+    if isinstance(stats, VFMStats):
+        vfm_stats = stats
+    elif isinstance(stats, VFMCache):
+        cache_params = vfm_kwargs | kwargs
+
+        if len(modes) > 1:
+            cache_params |= dict(mode=[int(m) for m in modes])
+
+        if analysis:
+            cache_params |= dict(analysis=int(analysis))
+
+        vfm_stats = stats.fetch(_field_match(), tff.is_tff, kwargs.get('field', None), cache_params)
+    elif stats is not None:
+        vfm_stats = VFMStats.from_clip(_field_match(), tff.is_tff, kwargs.get('field', None))
+        vfm_stats.save(stats)
 
-    fieldmatch = func.work_clip.vivtc.VFM(**(vfm_kwargs | kwargs))
+    fieldmatch = _field_match() if vfm_stats is None else vfm_stats.apply(out_clip, func.func)
 
-    if postprocess:
+    if isinstance(postprocess, TieredPostprocess):
+        fieldmatch = postprocess(fieldmatch, out_clip, vfm_stats)
+    elif postprocess:
         if callable(postprocess):
-            postprocess = postprocess(kwargs.get('clip2', clip))
+            postprocess = postprocess(out_clip)
 
         fieldmatch = find_prop_rfs(fieldmatch, postprocess, "_Combed", "==", 1)
 
     return func.return_clip(fieldmatch)
 
 
-def vdecimate(clip: vs.VideoNode, weight: float = 0.0, **kwargs: Any) -> vs.VideoNode:
+def _analysis_factor(analysis: bool | int, func: FuncExceptT) -> int:
+    factor = 1 if analysis is True else int(analysis)
+
+    if factor < 1 or factor & (factor - 1):
+        raise CustomValueError('The analysis downscale factor must be a power of two!', func, analysis)
+
+    return factor
+
+
+def _analysis_clip(clip: vs.VideoNode, factor: int = 1, tff: FieldBased | None = None) -> vs.VideoNode:
+    luma = get_y(clip)
+
+    if factor == 1:
+        return depth(luma, 8)
+
+    if tff is None:
+        return luma.resize.Bilinear(
+            max(clip.width // factor, 16) & ~1, max(clip.height // factor, 16) & ~1, format=vs.GRAY8
+        )
+
+    # Fields are scaled separately so that the combing VFM looks for is preserved
+    fields = luma.std.SeparateFields(tff.is_tff).resize.Bilinear(
+        max(clip.width // factor, 16) & ~1, max(clip.height // factor // 2, 8) & ~1, format=vs.GRAY8
+    )
+
+    return fields.std.DoubleWeave(tff.is_tff).std.SelectEvery(2, 0)
+
+
+@instrumented
+def vdecimate(
+    clip: vs.VideoNode, weight: float = 0.0, stats: VDecimateStats | SPathLike | bool = False,
+    timecodes: SPathLike | None = None, vfr_thr: float = 0.5, analysis: bool | int = False, shards: int = 1,
+    **kwargs: Any
+) -> vs.VideoNode:
     """
     Perform frame decimation using VDecimate.
 
     This function uses VIVTC's VDecimate plugin to remove duplicate frames from telecined content.
     It's recommended to use the vfm function before running this.
 
+    Duplicate detection rarely needs full detail, so with ``analysis`` the block metrics are computed
+    on a GRAY8, optionally downscaled clip, while the frames are still returned from the untouched input.
+
+    .. code-block:: python
+
+        # Compute the metrics on a GRAY8 clip at a quarter of the size
+        >>> vdecimate(clip, analysis=4)
+
     :param clip:            Input clip to decimate.
     :param weight:          Weight for frame blending. If > 0, blends duplicate frames before dropping one.
                             Default: 0.0 (frames are dropped, not blended).
+    :param stats:           Decision table mode. If True, the VDecimate metrics are computed once with a dryrun pass
+                            and the collected :py:class:`VDecimateStats` drive both the blending and the decimation.
+                            A :py:class:`VDecimateStats` object is used as is, and a path is used as a stats file,
+                            read if it exists and written after the analysis otherwise.
+                            Default: False (VDecimate is run as a filter).
+    :param timecodes:       VFR mode. If set, only cycles containing a duplicate (24p) are decimated,
+                            while the others (30p) are kept whole, and a v2 timecodes file is written here.
+                            The timecodes are written cycle by cycle while the clip is analysed.
+                            This implies the decision table mode.
+    :param vfr_thr:         Threshold used to tell 24p and 30p cycles apart in VFR mode.
+                            A cycle is 24p if the max block difference of the frame VDecimate would drop
+                            is at most this fraction of the average of the other frames of the cycle.
+    :param analysis:        Compute the VDecimate metrics on a GRAY8 clip instead of the input.
+                            If an int is passed, it is a power of two the clip is downscaled by,
+                            and the block sizes are scaled accordingly.
+                            Default: False (the metrics are computed on the whole input).
+    :param shards:          Number of cycle-aligned ranges analysed concurrently in the decision table mode,
+                            each by its own VDecimate instance. See :py:meth:`VDecimateStats.from_shards`.
+                            Requires ``stats`` or ``timecodes``.
+                            Default: 1 (a single VDecimate pass).
     :param kwargs:          Additional keyword arguments to pass to VDecimate.
                             For a list of parameters, see the VIVTC documentation.
 
@@ -222,13 +634,76 @@ def vdecimate(clip: vs.VideoNode, weight: float = 0.0, **kwargs: Any) -> vs.Vide
         else:
             vdecimate_kwargs |= dict(blockx=block[0], blocky=block[1])
 
-    if not kwargs.get('clip2', None) and func.work_clip.format is not clip.format:
-        vdecimate_kwargs |= dict(clip2=clip)
+    if analysis:
+        factor = _analysis_factor(analysis, func.func)
+
+        work_clip = _analysis_clip(clip, factor)
+
+        vdecimate_kwargs |= dict(clip2=clip, chroma=False)
+
+        if factor > 1:
+            params = vdecimate_kwargs | kwargs
+
+            kwargs |= dict(
+                blockx=max(params.get('blockx', 32) // factor, 4),
+                blocky=max(params.get('blocky', 32) // factor, 4)
+            )
+    else:
+        work_clip = func.work_clip
+
+        if not kwargs.get('clip2', None) and work_clip.format is not clip.format:
+            vdecimate_kwargs |= dict(clip2=clip)
 
     dryrun = kwargs.pop('dryrun', False)
 
+    if shards > 1 and (dryrun or (stats is False and timecodes is None)):
+        raise CustomValueError('Sharded analysis is only available in the decision table mode!', func.func, shards)
+
+    if (stats is not False or timecodes is not None) and not dryrun:
+        writer = None if timecodes is None else VFRTimecodes(timecodes, clip.fps, vfr_thr)
+
+        with writer or nullcontext():
+            if not isinstance(stats, VDecimateStats) and stats not in (True, False) and SPath(stats).exists():
+                stats = VDecimateStats.load(stats, func.func)
+
+            stats_file: SPathLike | bool = False
+
+            if isinstance(stats, VDecimateStats):
+                if writer:
+                    for index in range(stats.num_cycles):
+                        writer.write_cycle(stats, index)
+            elif shards > 1:
+                dryrun_kwargs = {
+                    name: value for name, value in (vdecimate_kwargs | kwargs).items() if name != 'clip2'
+                }
+
+                stats_file, stats = stats, VDecimateStats.from_shards(
+                    work_clip, lambda shard: shard.vivtc.VDecimate(dryrun=True, **dryrun_kwargs),
+                    kwargs.get('cycle', 5), shards, on_cycle=writer and writer.write_cycle
+                )
+            else:
+                stats_file, stats = stats, VDecimateStats.from_clip(
+                    work_clip.vivtc.VDecimate(dryrun=True, **(vdecimate_kwargs | kwargs)),
+                    kwargs.get('cycle', 5), on_cycle=writer and writer.write_cycle
+                )
+
+            if stats_file not in (True, False):
+                stats.save(stats_file)
+
+        clip = kwargs.pop('clip2', clip)
+
+        vfr = None if timecodes is None else vfr_thr
+
+        if weight:
+            kept = set(stats.vfr_frame_map(vfr) if vfr is not None else stats.kept)
+
+            avg = clip.std.AverageFrames(weights=[0, 1 - weight, weight])
+            clip = replace_ranges(clip, avg, [n for n in range(len(stats)) if n not in kept])
+
+        return stats.decimate(clip, vfr, func.func)
+
     if dryrun or weight:
-        stats = func.work_clip.vivtc.VDecimate(dryrun=True, **(vdecimate_kwargs | kwargs))
+        stats = work_clip.vivtc.VDecimate(dryrun=True, **(vdecimate_kwargs | kwargs))
 
         if dryrun:
             return func.return_clip(stats)
@@ -239,6 +714,6 @@ def vdecimate(clip: vs.VideoNode, weight: float = 0.0, **kwargs: Any) -> vs.Vide
         splice = find_prop_rfs(clip, avg, "VDecimateDrop", "==", 1, stats)
         vdecimate_kwargs |= dict(clip2=splice)
 
-    decimate = func.work_clip.vivtc.VDecimate(**(vdecimate_kwargs | kwargs))
+    decimate = work_clip.vivtc.VDecimate(**(vdecimate_kwargs | kwargs))
 
     return func.return_clip(decimate)
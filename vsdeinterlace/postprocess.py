@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from threading import Lock
+
+from vstools import CustomValueError, VSFunctionNoArgs, core, get_prop, vs
+
+from .stats import VFMStats
+from .utils import apply_frame_map
+
+__all__ = [
+    'TieredPostprocess'
+]
+
+
+class TieredPostprocess:
+    """
+    Postprocess the combed frames left by VFM with filters of increasing cost, depending on how combed they are.
+
+    How combed a frame is is judged by the mic (max combed block value) VFM computed for the match it picked,
+    so VFM has to be run with ``micout``, which :py:func:`vfm` does when it is passed a tiered postprocess.
+    Every tier has a threshold, and a combed frame is sent to the tier with the highest threshold not above its mic.
+    Combed frames below the first threshold are left as they were matched,
+    and combed frames without a mic are sent to the first tier.
+
+    .. code-block:: python
+
+        >>> tiers = TieredPostprocess((0, vinverse), (120, lambda x: Nnedi3().interpolate(x, double_y=False)))
+        >>> out = vfm(clip, postprocess=tiers)
+        >>> # After rendering
+        >>> tiers.counts
+        [1523, 87]
+    """
+
+    tiers: list[tuple[int, vs.VideoNode | VSFunctionNoArgs]]
+    """Thresholds and filters (or clips) of every tier, by increasing threshold."""
+
+    frames: dict[int, int]
+    """Tier every postprocessed frame went to."""
+
+    def __init__(self, *tiers: tuple[int, vs.VideoNode | VSFunctionNoArgs]) -> None:
+        """
+        :param tiers:       Minimum mic and filter or clip of every tier.
+                            A filter takes the clip passed to VFM, a clip is used as the postprocessed clip.
+        """
+
+        if not tiers:
+            raise CustomValueError('You must pass at least one tier!', self.__class__)
+
+        self.tiers = sorted(tiers, key=lambda tier: tier[0])
+        self.frames = {}
+
+        self._lock = Lock()
+
+    @property
+    def thresholds(self) -> list[int]:
+        return [threshold for threshold, _ in self.tiers]
+
+    @property
+    def counts(self) -> list[int]:
+        """
+        Number of frames each tier processed.
+
+        When VFM stats are available, these are known for the whole clip as soon as the clip is built.
+        Otherwise they are updated while frames are rendered.
+        """
+
+        counts = [0] * len(self.tiers)
+
+        for tier in self.frames.values():
+            counts[tier] += 1
+
+        return counts
+
+    def tier(self, mic: int | None) -> int:
+        """
+        Get the tier of a combed frame from its mic, or -1 if it shouldn't be postprocessed.
+        Frames without a mic go to the first tier, like a single postprocess would handle them.
+        """
+
+        if mic is None or mic < 0:
+            return 0
+
+        return bisect_right(self.thresholds, mic) - 1
+
+    def __call__(self, fieldmatch: vs.VideoNode, clip: vs.VideoNode, stats: VFMStats | None = None) -> vs.VideoNode:
+        """
+        Replace the combed frames of a field matched clip with the output of their tier.
+
+        :param fieldmatch:  Field matched clip, with VFM's frame properties.
+        :param clip:        Clip passed to the filters of the tiers.
+        :param stats:       Decisions of the VFM pass. If given, the tiers are picked with a single frame map
+                            instead of reading the frame properties of every frame.
+
+        :return:            Postprocessed clip.
+        """
+
+        clips = [
+            postprocess(clip) if callable(postprocess) else postprocess
+            for _, postprocess in self.tiers
+        ]
+
+        if stats is not None:
+            if len(stats) != fieldmatch.num_frames:
+                raise CustomValueError(
+                    'The stats don\'t match the clip length!', self.__class__, (len(stats), fieldmatch.num_frames)
+                )
+
+            frame_map = list(range(fieldmatch.num_frames))
+
+            with self._lock:
+                for n, combed in enumerate(stats.combed):
+                    if combed and (tier := self.tier(stats.mic(n))) >= 0:
+                        frame_map[n] += (tier + 1) * fieldmatch.num_frames
+                        self.frames[n] = tier
+
+            return apply_frame_map(core.std.Splice([fieldmatch, *clips], True), frame_map, fieldmatch.fps)
+
+        def _select(n: int, f: vs.VideoFrame) -> vs.VideoNode:
+            if not get_prop(f, '_Combed', int, default=0):
+                return fieldmatch
+
+            mics = f.props.get('VFMMics', None)
+
+            tier = self.tier(None if mics is None else mics[get_prop(f, 'VFMMatch', int, default=1)])
+
+            if tier < 0:
+                return fieldmatch
+
+            with self._lock:
+                self.frames[n] = tier
+
+            return clips[tier]
+
+        return fieldmatch.std.FrameEval(_select, fieldmatch, clips)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from vstools import CustomIntEnum, CustomValueError, FieldBased, FieldBasedT, core, vs
+
+from .ivtc import vfm
+from .stats import VFMStats
+from .utils import apply_frame_map
+
+__all__ = [
+    'SectionType', 'Section', 'SectionMap',
+
+    'scan_sections'
+]
+
+
+class SectionType(CustomIntEnum):
+    """Kind of content of a section of a hybrid source."""
+
+    FILM = 0
+    """Telecined film. Field matching recovers progressive frames, to decimate afterwards."""
+
+    VIDEO = 1
+    """True interlaced video. Field matching leaves combed frames, so it has to be deinterlaced."""
+
+    PROGRESSIVE = 2
+    """Progressive frames, every frame matching its own fields."""
+
+
+@dataclass
+class Section:
+    start: int
+    """First frame of the section."""
+
+    end: int
+    """Frame after the last one of the section."""
+
+    type: SectionType
+    """Content of the section."""
+
+
+class SectionMap:
+    """
+    Run-length map of the film, video and progressive sections of a clip.
+
+    The map routes every section to its own processing in a single graph,
+    so each path only renders the frames of its sections.
+
+    .. code-block:: python
+
+        >>> sections = scan_sections(src)
+        >>> out = sections.route(vfm(src), Nnedi3().interpolate(src, double_y=False), src)
+    """
+
+    sections: list[Section]
+    """Sections, in order and covering the whole clip."""
+
+    def __init__(self, sections: list[Section]) -> None:
+        self.sections = sections
+
+    def __iter__(self) -> Iterator[Section]:
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    @property
+    def num_frames(self) -> int:
+        return self.sections[-1].end if self.sections else 0
+
+    @classmethod
+    def from_stats(
+        cls, stats: VFMStats, cycle: int = 5, video_thr: int = 2, mic_thr: int | None = None, min_length: int = 2
+    ) -> SectionMap:
+        """
+        Classify every cycle of a clip from the decisions of a VFM pass.
+
+        A cycle is video if at least ``video_thr`` of its frames are still combed after field matching,
+        progressive if every frame was matched with its own fields, and film otherwise.
+
+        :param stats:       VFM decisions of the clip.
+        :param cycle:       Number of frames classified together.
+        :param video_thr:   Number of combed frames making a cycle video.
+        :param mic_thr:     If set, frames whose mic for their match is above this are also counted as combed.
+                            The stats must have been collected with ``micout``.
+        :param min_length:  Minimum number of cycles of a section. Shorter sections are merged into the previous one.
+
+        :return:            Section map.
+        """
+
+        sections = list[Section]()
+
+        for start in range(0, len(stats), cycle):
+            frames = range(start, min(start + cycle, len(stats)))
+
+            combed = sum(1 for n in frames if stats.combed[n] or (mic_thr is not None and _mic(stats, n) > mic_thr))
+
+            if combed >= video_thr:
+                kind = SectionType.VIDEO
+            elif all(stats.match[n] == 1 for n in frames):
+                kind = SectionType.PROGRESSIVE
+            else:
+                kind = SectionType.FILM
+
+            if sections and sections[-1].type == kind:
+                sections[-1].end = frames.stop
+            else:
+                sections.append(Section(start, frames.stop, kind))
+
+        merged = list[Section]()
+
+        for section in sections:
+            if merged and (merged[-1].type == section.type or section.end - section.start < min_length * cycle):
+                merged[-1].end = section.end
+            else:
+                merged.append(section)
+
+        return cls(merged)
+
+    def ranges(self, kind: SectionType) -> list[tuple[int, int]]:
+        """Get the (start, end) frames of every section of a kind."""
+
+        return [(section.start, section.end) for section in self.sections if section.type == kind]
+
+    def route(
+        self, film: vs.VideoNode, video: vs.VideoNode | None = None, progressive: vs.VideoNode | None = None
+    ) -> vs.VideoNode:
+        """
+        Build a clip taking the frames of every section from the clip processed for its kind.
+
+        All the clips must have the same number of frames as the map,
+        so decimation has to happen after routing, for example with the decision table mode of ``vdecimate``.
+
+        :param film:            Clip for the film sections, also used for the kinds without a clip.
+        :param video:           Clip for the video sections.
+        :param progressive:     Clip for the progressive sections.
+
+        :return:                Routed clip.
+        """
+
+        clips = {SectionType.FILM: film, SectionType.VIDEO: video or film, SectionType.PROGRESSIVE: progressive or film}
+
+        if any(clip.num_frames != self.num_frames for clip in clips.values()):
+            raise CustomValueError('All the clips must have the same length as the section map!', self.route)
+
+        frame_map = [
+            n + section.type * self.num_frames
+            for section in self.sections for n in range(section.start, section.end)
+        ]
+
+        return apply_frame_map(core.std.Splice([clips[kind] for kind in SectionType], True), frame_map, film.fps)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({[(s.start, s.end, s.type.name) for s in self.sections]})'
+
+
+def _mic(stats: VFMStats, n: int) -> int:
+    if (mic := stats.mic(n)) is None:
+        raise CustomValueError(
+            'The VFM stats have no mics, they must be collected with micout!', SectionMap.from_stats, n
+        )
+
+    return mic
+
+
+def scan_sections(
+    clip: vs.VideoNode, tff: FieldBasedT | None = None, cycle: int = 5, video_thr: int = 2,
+    mic_thr: int | None = None, min_length: int = 2, progress: str | None = None, **kwargs: Any
+) -> SectionMap:
+    """
+    Run VFM on a clip and classify its sections. See :py:meth:`SectionMap.from_stats`.
+
+    :param clip:        Clip to scan.
+    :param tff:         Field order of the clip. If None, it will be automatically detected.
+    :param progress:    Progress message of the VFM pass.
+    :param kwargs:      Additional keyword arguments passed to :py:func:`vfm`.
+
+    :return:            Section map.
+    """
+
+    tff = FieldBased.from_param_or_video(tff, clip, False, scan_sections)
+
+    stats = VFMStats.from_clip(
+        vfm(clip, tff, **(dict(micout=1) | kwargs)), tff.is_tff, kwargs.get('field', None), progress
+    )
+
+    return SectionMap.from_stats(stats, cycle, video_thr, mic_thr, min_length)
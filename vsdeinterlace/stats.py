@@ -0,0 +1,881 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+from fractions import Fraction
+from threading import Lock
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Sequence, TextIO
+
+from vstools import (
+    CustomValueError, FieldBased, FuncExceptT, SPath, SPathLike, clip_async_render, get_prop, vs
+)
+
+from .utils import apply_frame_map
+
+if TYPE_CHECKING:
+    from .ivtc import IVTCycles, PulldownCycle
+
+__all__ = [
+    'VFMStats', 'VFMCache',
+
+    'VDecimateStats',
+
+    'VFRTimecodes',
+
+    'DecimationPlan'
+]
+
+
+def _write_arrays(path: SPathLike, header: bytes, *arrays: array[int]) -> None:
+    with open(path, 'wb') as f:
+        f.write(header)
+
+        for arr in arrays:
+            if sys.byteorder == 'big':
+                arr = array(arr.typecode, arr)
+                arr.byteswap()
+
+            arr.tofile(f)
+
+
+def _read_array(data: memoryview, offset: int, typecode: str, count: int) -> tuple[array[int], int]:
+    arr = array(typecode)
+    size = arr.itemsize * count
+
+    arr.frombytes(data[offset:offset + size])
+
+    if sys.byteorder == 'big':
+        arr.byteswap()
+
+    return arr, offset + size
+
+
+class VFMStats:
+    """
+    Per-frame decisions of a VFM pass.
+
+    These can be saved to a compact binary file and replayed on the source clip,
+    skipping the VFM metric computations entirely.
+    """
+
+    MAGIC = b'VFMS'
+    VERSION = 1
+
+    _header = struct.Struct('<4sBBBxI')
+
+    match: array[int]
+    """Match code per frame (0 = p, 1 = c, 2 = n, 3 = b, 4 = u)."""
+
+    combed: array[int]
+    """Value of the ``_Combed`` property per frame."""
+
+    scenechange: array[int]
+    """Value of the ``VFMSceneChange`` property per frame."""
+
+    mics: array[int]
+    """``VFMMics`` of every frame, five values per frame. Missing mics, when VFM ran without ``micout``, are -1."""
+
+    def __init__(
+        self, tff: bool, field: int | None = None, match: array[int] | None = None,
+        combed: array[int] | None = None, scenechange: array[int] | None = None, mics: array[int] | None = None
+    ) -> None:
+        """
+        :param tff:         Field order the matches were computed with.
+        :param field:       Field VFM kept while matching (0 = bottom, 1 = top). Default: same as the field order.
+        """
+
+        self.tff = tff
+        self.field = int(tff) if field is None or field == 2 else field
+
+        self.match = array('b') if match is None else match
+        self.combed = array('b') if combed is None else combed
+        self.scenechange = array('b') if scenechange is None else scenechange
+        self.mics = array('i') if mics is None else mics
+
+    def __len__(self) -> int:
+        return len(self.match)
+
+    def append(self, props: vs.FrameProps) -> None:
+        """Add the decisions of the next frame from VFM's frame properties."""
+
+        mics = props.get('VFMMics', None)
+
+        self.match.append(get_prop(props, 'VFMMatch', int, default=1))
+        self.combed.append(get_prop(props, '_Combed', int, default=0))
+        self.scenechange.append(get_prop(props, 'VFMSceneChange', int, default=0))
+        self.mics.extend(list(mics) if mics is not None else [-1] * 5)
+
+    def mic(self, n: int) -> int | None:
+        """Mic of the match picked for frame ``n``, or None if VFM didn't compute it."""
+
+        mic = self.mics[n * 5 + self.match[n]]
+
+        return None if mic < 0 else mic
+
+    @classmethod
+    def from_clip(
+        cls, fieldmatched: vs.VideoNode, tff: bool, field: int | None = None,
+        progress: str | Callable[[int, int], None] | None = None
+    ) -> VFMStats:
+        """
+        Render a VFM clip and collect its per-frame decisions.
+
+        :param fieldmatched:    Output of ``vivtc.VFM``. The mics are only collected if it was run with ``micout``.
+        :param tff:             Field order passed to VFM.
+        :param field:           Field passed to VFM.
+        :param progress:        Progress message or callback passed to the renderer.
+
+        :return:                Collected stats.
+        """
+
+        stats = cls(tff, field)
+
+        for props in clip_async_render(fieldmatched, None, progress, lambda n, f: f.props.copy()):
+            stats.append(props)
+
+        return stats
+
+    def save(self, path: SPathLike) -> None:
+        """Write the stats to a binary file."""
+
+        flags = array('B', [
+            match | (combed << 3) | (sc << 4)
+            for match, combed, sc in zip(self.match, self.combed, self.scenechange)
+        ])
+
+        _write_arrays(
+            path, self._header.pack(self.MAGIC, self.VERSION, self.tff, self.field, len(self)), flags, self.mics
+        )
+
+    @classmethod
+    def load(cls, path: SPathLike, func: FuncExceptT | None = None) -> VFMStats:
+        """Read stats previously written with :py:meth:`save`."""
+
+        data = memoryview(SPath(path).read_bytes())
+
+        if len(data) < cls._header.size:
+            raise CustomValueError('The stats file is truncated!', func or cls.load, path)
+
+        magic, version, tff, field, num_frames = cls._header.unpack_from(data)
+
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise CustomValueError('This is not a valid VFM stats file!', func or cls.load, path)
+
+        flags, offset = _read_array(data, cls._header.size, 'B', num_frames)
+        mics, offset = _read_array(data, offset, 'i', num_frames * 5)
+
+        if len(mics) != num_frames * 5:
+            raise CustomValueError('The stats file is truncated!', func or cls.load, path)
+
+        return cls(
+            bool(tff), field,
+            array('b', [f & 0b111 for f in flags]),
+            array('b', [(f >> 3) & 1 for f in flags]),
+            array('b', [(f >> 4) & 1 for f in flags]),
+            mics
+        )
+
+    def match_fields(self, n: int) -> tuple[int, int]:
+        """
+        Get the field numbers (top, bottom) making up frame ``n``,
+        indexing ``SeparateFields`` of the source with the stats field order.
+        """
+
+        last = len(self) - 1
+
+        def _fields(i: int) -> tuple[int, int]:
+            i = min(max(i, 0), last)
+            top, bottom = (2 * i, 2 * i + 1) if self.tff else (2 * i + 1, 2 * i)
+            return (top, bottom) if self.field else (bottom, top)
+
+        kept, other = _fields(n)
+
+        match self.match[n]:
+            case 0:
+                other = _fields(n - 1)[1]
+            case 2:
+                other = _fields(n + 1)[1]
+            case 3:
+                kept = _fields(n - 1)[0]
+            case 4:
+                kept = _fields(n + 1)[0]
+
+        return (kept, other) if self.field else (other, kept)
+
+    def apply(self, clip: vs.VideoNode, func: FuncExceptT | None = None) -> vs.VideoNode:
+        """
+        Replay the matches on a clip without running VFM.
+
+        The output has the same frame properties VFM would set.
+
+        :param clip:        Source clip the stats were computed from.
+
+        :return:            Field matched clip.
+        """
+
+        if clip.num_frames != len(self):
+            raise CustomValueError(
+                'The stats don\'t match the clip length! ({stats} != {clip})', func or self.apply,
+                stats=len(self), clip=clip.num_frames
+            )
+
+        fields = clip.std.SeparateFields(self.tff)
+
+        field_map = array('i')
+
+        for n in range(len(self)):
+            field_map.extend(self.match_fields(n))
+
+        woven = apply_frame_map(fields, field_map).std.DoubleWeave(True).std.SelectEvery(2, 0)
+
+        def _set_props(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+            fout = f.copy()
+            fout.props.update(self.frame_props(n))
+            return fout
+
+        return FieldBased.PROGRESSIVE.apply(woven.std.ModifyFrame(woven, _set_props))
+
+    def frame_props(self, n: int) -> dict[str, Any]:
+        """Frame properties VFM sets on frame ``n``."""
+
+        return dict(
+            VFMMatch=self.match[n], _Combed=self.combed[n],
+            VFMMics=list(self.mics[n * 5:n * 5 + 5]), VFMSceneChange=self.scenechange[n]
+        )
+
+
+class VFMCache:
+    """
+    Persistent cache of VFM analysis, shared between every script working on the same source.
+
+    Each source file and set of VFM parameters gets its own memory-mapped file holding the match,
+    combed flag, scene change flag and mics of every frame, indexed by the frame number in the source.
+    Only frames that were never analysed with these parameters are rendered, so previews of parts of the clip
+    fill the cache progressively and a final encode reuses them.
+    VFM matches the first and last frames of a trimmed clip against repeated frames,
+    so their analysis is only kept if they are also the first and last frames of the source.
+    Changing the parameters, or modifying the source file, selects another cache file,
+    leaving the analysis made with the previous parameters available.
+
+    .. code-block:: python
+
+        >>> cache = VFMCache('.vfmcache', 'episode01.m2ts')
+        >>> vfm(src, stats=cache)
+    """
+
+    MAGIC = b'VFMC'
+    VERSION = 1
+
+    _header = struct.Struct('<4sBBBx')
+    _record = 6
+
+    def __init__(
+        self, directory: SPathLike, source: SPathLike, start: int = 0, num_frames: int | None = None
+    ) -> None:
+        """
+        :param directory:   Directory holding the cache files.
+        :param source:      Source file the clip comes from, used to identify it.
+        :param start:       Frame number in the source of the first frame of the clip.
+        :param num_frames:  Number of frames of the source. If None, the last frame of the clip
+                            is analysed again on every fetch, as it can't be told apart from the end of the source.
+        """
+
+        self.directory = SPath(directory)
+        self.source = SPath(source).resolve()
+        self.start = start
+        self.num_frames = num_frames
+
+    def key(self, params: dict[str, Any]) -> str:
+        """
+        Get the cache key for the source file and the given VFM parameters.
+
+        Clips passed as parameters, like ``clip2``, only change the output and not the analysis, so they are ignored.
+        """
+
+        stat = self.source.stat()
+
+        params = {
+            name: int(value) if isinstance(value, int) else value
+            for name, value in params.items() if not isinstance(value, vs.RawNode)
+        }
+
+        return sha1(json.dumps(
+            [str(self.source), stat.st_size, stat.st_mtime_ns, params], sort_keys=True, default=str
+        ).encode()).hexdigest()
+
+    def path(self, params: dict[str, Any]) -> SPath:
+        return self.directory / f'{self.key(params)}.vfmcache'
+
+    def _map(self, path: SPath, num_frames: int, tff: bool, field: int) -> mmap.mmap:
+        size = self._header.size + num_frames * self._record * 4
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(path, 'r+b' if path.exists() else 'w+b') as f:
+            header = f.read(self._header.size)
+
+            if header != self._header.pack(self.MAGIC, self.VERSION, tff, field):
+                f.seek(0)
+                f.truncate(0)
+                f.write(self._header.pack(self.MAGIC, self.VERSION, tff, field))
+
+            if f.seek(0, 2) < size:
+                f.truncate(size)
+
+            return mmap.mmap(f.fileno(), 0)
+
+    def fetch(
+        self, fieldmatched: vs.VideoNode, tff: bool, field: int | None, params: dict[str, Any],
+        progress: str | Callable[[int, int], None] | None = None
+    ) -> VFMStats:
+        """
+        Get the VFM decisions of a clip, analysing only the frames missing from the cache.
+
+        :param fieldmatched:    VFM clip, only rendered for the missing frames.
+                                The mics are only collected if it was run with ``micout``.
+        :param tff:             Field order passed to VFM.
+        :param field:           Field passed to VFM.
+        :param params:          Every VFM parameter affecting the analysis.
+        :param progress:        Progress message or callback passed to the renderer.
+
+        :return:                Stats of the clip.
+        """
+
+        stats = VFMStats(tff, field)
+        end = self.start + fieldmatched.num_frames
+
+        mm = self._map(self.path(params), end, tff, stats.field)
+        records = memoryview(mm)[self._header.size:].cast('i')
+
+        # Frames matched against a repeated frame at the edges of a trimmed clip are stored without the valid bit
+        edges = {n for n, edge in ((self.start, self.start > 0), (end - 1, end != self.num_frames)) if edge}
+
+        try:
+            missing = [n for n in range(self.start, end) if not records[n * self._record] & 0x100]
+
+            for first, last in _to_runs(missing):
+                def _store(n: int, f: vs.VideoFrame, first: int = first) -> None:
+                    props = f.props
+                    record = (n + first) * self._record
+
+                    records[record + 1:record + self._record] = array('i', list(props.get('VFMMics', [-1] * 5)))
+                    records[record] = (0 if n + first in edges else 0x100) | (
+                        get_prop(props, 'VFMMatch', int, default=1)
+                        | (get_prop(props, '_Combed', int, default=0) << 3)
+                        | (get_prop(props, 'VFMSceneChange', int, default=0) << 4)
+                    )
+
+                clip_async_render(fieldmatched[first - self.start:last - self.start], None, progress, _store)
+
+            mm.flush()
+
+            for n in range(self.start, end):
+                flags = records[n * self._record]
+
+                stats.match.append(flags & 0b111)
+                stats.combed.append((flags >> 3) & 1)
+                stats.scenechange.append((flags >> 4) & 1)
+                stats.mics.extend(records[n * self._record + 1:(n + 1) * self._record])
+        finally:
+            records.release()
+            mm.close()
+
+        return stats
+
+    def invalidate(self, params: dict[str, Any], first: int = 0, last: int | None = None) -> None:
+        """
+        Mark a range of source frames as stale, so it is analysed again on the next fetch.
+
+        :param params:      VFM parameters of the cache to invalidate.
+        :param first:       First source frame to invalidate.
+        :param last:        Source frame after the last one to invalidate. Default: until the end.
+        """
+
+        path = self.path(params)
+
+        if not path.exists():
+            return
+
+        with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+            records = memoryview(mm)[self._header.size:].cast('i')
+
+            try:
+                num_frames = len(records) // self._record
+
+                for n in range(first, num_frames if last is None else min(last, num_frames)):
+                    records[n * self._record] = 0
+            finally:
+                records.release()
+
+
+def _to_runs(frames: list[int]) -> list[tuple[int, int]]:
+    runs = list[tuple[int, int]]()
+
+    for n in frames:
+        if runs and runs[-1][1] == n:
+            runs[-1] = (runs[-1][0], n + 1)
+        else:
+            runs.append((n, n + 1))
+
+    return runs
+
+
+class VDecimateStats:
+    """
+    Per-frame metrics and drop decisions of a VDecimate dryrun pass.
+
+    This acts as a decision table: once collected, frames can be dropped,
+    blended or otherwise processed from it without running VDecimate again.
+    """
+
+    MAGIC = b'VDCS'
+    VERSION = 1
+
+    _header = struct.Struct('<4sBxHI')
+
+    drop: array[int]
+    """Value of the ``VDecimateDrop`` property per frame."""
+
+    maxblockdiff: array[int]
+    """Value of the ``VDecimateMaxBlockDiff`` property per frame."""
+
+    totaldiff: array[int]
+    """Value of the ``VDecimateTotalDiff`` property per frame."""
+
+    def __init__(
+        self, cycle: int = 5, drop: array[int] | None = None,
+        maxblockdiff: array[int] | None = None, totaldiff: array[int] | None = None
+    ) -> None:
+        """
+        :param cycle:       Cycle length VDecimate was run with.
+        """
+
+        self.cycle = cycle
+
+        self.drop = array('b') if drop is None else drop
+        self.maxblockdiff = array('q') if maxblockdiff is None else maxblockdiff
+        self.totaldiff = array('q') if totaldiff is None else totaldiff
+
+    def __len__(self) -> int:
+        return len(self.drop)
+
+    def append(self, props: vs.FrameProps) -> None:
+        """Add the metrics of the next frame from VDecimate's frame properties."""
+
+        self.drop.append(get_prop(props, 'VDecimateDrop', int, default=0))
+        self.maxblockdiff.append(get_prop(props, 'VDecimateMaxBlockDiff', int, default=0))
+        self.totaldiff.append(get_prop(props, 'VDecimateTotalDiff', int, default=0))
+
+    @classmethod
+    def from_clip(
+        cls, dryrun: vs.VideoNode, cycle: int = 5, progress: str | Callable[[int, int], None] | None = None,
+        on_cycle: Callable[[VDecimateStats, int], None] | None = None
+    ) -> VDecimateStats:
+        """
+        Render a ``VDecimate(dryrun=True)`` clip and collect its metrics.
+
+        :param dryrun:      Output of VDecimate in dryrun mode.
+        :param cycle:       Cycle length passed to VDecimate.
+        :param progress:    Progress message or callback passed to the renderer.
+        :param on_cycle:    Called with the stats and the cycle number as soon as every frame
+                            of a cycle has been analysed, in cycle order.
+
+        :return:            Collected stats.
+        """
+
+        stats = cls(cycle)
+
+        pending = dict[int, vs.FrameProps]()
+        lock = Lock()
+
+        def _collect(n: int, f: vs.VideoFrame) -> None:
+            with lock:
+                pending[n] = f.props.copy()
+
+                while len(stats) in pending:
+                    stats.append(pending.pop(len(stats)))
+
+                    if on_cycle and (len(stats) % cycle == 0 or len(stats) == dryrun.num_frames):
+                        on_cycle(stats, (len(stats) - 1) // cycle)
+
+        clip_async_render(dryrun, None, progress, _collect)
+
+        return stats
+
+    @classmethod
+    def from_shards(
+        cls, clip: vs.VideoNode, dryrun: Callable[[vs.VideoNode], vs.VideoNode], cycle: int = 5,
+        shards: int | None = None, progress: Callable[[int, int], None] | None = None,
+        on_cycle: Callable[[VDecimateStats, int], None] | None = None
+    ) -> VDecimateStats:
+        """
+        Collect the metrics of a clip by running independent VDecimate dryrun passes on ranges of it concurrently.
+
+        VDecimate analyses the cycles of a clip strictly in order, so a single dryrun pass keeps one core busy.
+        The clip is split into cycle-aligned ranges, each analysed by its own VDecimate instance
+        with one cycle of context before it, so that the metrics are the same as a single pass.
+
+        .. code-block:: python
+
+            >>> stats = VDecimateStats.from_shards(clip, lambda x: x.vivtc.VDecimate(dryrun=True), shards=8)
+
+        :param clip:        Clip to analyse.
+        :param dryrun:      Function building the VDecimate dryrun clip of a range of the clip.
+        :param cycle:       Cycle length passed to VDecimate.
+        :param shards:      Number of ranges analysed concurrently. Default: number of threads of the core.
+        :param progress:    Called with the number of analysed frames and the total.
+        :param on_cycle:    Called with the stats and the cycle number once every frame of a cycle
+                            and of the ones before it has been analysed, in cycle order.
+
+        :return:            Collected stats.
+        """
+
+        num_cycles = -(-clip.num_frames // cycle)
+        shards = max(min(shards or clip.core.num_threads, num_cycles), 1)
+
+        bounds = [round(i * num_cycles / shards) * cycle for i in range(shards)] + [clip.num_frames]
+
+        done = [0] * shards
+        total = clip.num_frames + cycle * (shards - 1)
+        lock = Lock()
+
+        def _analyse(index: int) -> VDecimateStats:
+            start, end = bounds[index], bounds[index + 1]
+            context = min(start, cycle)
+
+            # The stats of a shard are collected in order, so their length is the number of analysed frames
+            def _progress(shard: VDecimateStats, _: int) -> None:
+                assert progress
+
+                with lock:
+                    done[index] = len(shard)
+                    progress(sum(done), total)
+
+            shard = cls.from_clip(
+                dryrun(clip[start - context:end]), cycle, on_cycle=_progress if progress else None
+            )
+
+            return cls(cycle, shard.drop[context:], shard.maxblockdiff[context:], shard.totaldiff[context:])
+
+        stats = cls(cycle)
+
+        with ThreadPoolExecutor(shards) as executor:
+            for shard in executor.map(_analyse, range(shards)):
+                first = stats.num_cycles
+
+                stats.drop.extend(shard.drop)
+                stats.maxblockdiff.extend(shard.maxblockdiff)
+                stats.totaldiff.extend(shard.totaldiff)
+
+                if on_cycle:
+                    for index in range(first, stats.num_cycles):
+                        on_cycle(stats, index)
+
+        return stats
+
+    def save(self, path: SPathLike) -> None:
+        """Write the stats to a binary file."""
+
+        _write_arrays(
+            path, self._header.pack(self.MAGIC, self.VERSION, self.cycle, len(self)),
+            self.drop, self.maxblockdiff, self.totaldiff
+        )
+
+    @classmethod
+    def load(cls, path: SPathLike, func: FuncExceptT | None = None) -> VDecimateStats:
+        """Read stats previously written with :py:meth:`save`."""
+
+        data = memoryview(SPath(path).read_bytes())
+
+        if len(data) < cls._header.size:
+            raise CustomValueError('The stats file is truncated!', func or cls.load, path)
+
+        magic, version, cycle, num_frames = cls._header.unpack_from(data)
+
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise CustomValueError('This is not a valid VDecimate stats file!', func or cls.load, path)
+
+        drop, offset = _read_array(data, cls._header.size, 'b', num_frames)
+        maxblockdiff, offset = _read_array(data, offset, 'q', num_frames)
+        totaldiff, offset = _read_array(data, offset, 'q', num_frames)
+
+        if len(totaldiff) != num_frames:
+            raise CustomValueError('The stats file is truncated!', func or cls.load, path)
+
+        return cls(cycle, drop, maxblockdiff, totaldiff)
+
+    @property
+    def dropped(self) -> list[int]:
+        """Frames VDecimate drops."""
+
+        return [n for n, drop in enumerate(self.drop) if drop]
+
+    @property
+    def kept(self) -> array[int]:
+        """Frames VDecimate keeps, in output order."""
+
+        return array('i', [n for n, drop in enumerate(self.drop) if not drop])
+
+    @property
+    def num_cycles(self) -> int:
+        return -(-len(self) // self.cycle)
+
+    def cycle_range(self, index: int) -> range:
+        """Frames of cycle ``index``."""
+
+        return range(index * self.cycle, min((index + 1) * self.cycle, len(self)))
+
+    def is_film(self, index: int, vfr_thr: float = 0.5) -> bool:
+        """
+        Check whether cycle ``index`` contains a duplicate, i.e. whether it is 24p rather than 30p material.
+
+        :param index:       Cycle number.
+        :param vfr_thr:     The frame VDecimate drops is considered a duplicate if its max block difference
+                            is at most this fraction of the average of the other frames of the cycle.
+
+        :return:            Whether the cycle should be decimated.
+        """
+
+        frames = self.cycle_range(index)
+
+        dropped = [n for n in frames if self.drop[n]]
+        others = [self.maxblockdiff[n] for n in frames if not self.drop[n]]
+
+        if not dropped:
+            return False
+
+        return self.maxblockdiff[dropped[0]] <= vfr_thr * sum(others) / max(len(others), 1)
+
+    def cycle_frames(self, index: int, vfr_thr: float | None = None) -> list[int]:
+        """
+        Frames of cycle ``index`` kept after decimation.
+
+        :param index:       Cycle number.
+        :param vfr_thr:     If not None, cycles without a duplicate are kept whole. See :py:meth:`is_film`.
+
+        :return:            Kept frames.
+        """
+
+        frames = self.cycle_range(index)
+
+        if vfr_thr is not None and not self.is_film(index, vfr_thr):
+            return list(frames)
+
+        return [n for n in frames if not self.drop[n]]
+
+    def vfr_frame_map(self, vfr_thr: float = 0.5) -> array[int]:
+        """Frames kept when decimating only the 24p cycles. See :py:meth:`is_film`."""
+
+        frame_map = array('i')
+
+        for index in range(self.num_cycles):
+            frame_map.extend(self.cycle_frames(index, vfr_thr))
+
+        return frame_map
+
+    def decimate(
+        self, clip: vs.VideoNode, vfr_thr: float | None = None, func: FuncExceptT | None = None
+    ) -> vs.VideoNode:
+        """
+        Drop the frames marked by VDecimate from a clip with a single remap.
+
+        :param clip:        Clip to decimate. Must have the same length as the analysed clip.
+        :param vfr_thr:     If not None, only decimate the 24p cycles. See :py:meth:`is_film`.
+                            The framerate of the clip is left untouched and
+                            the timestamps have to be taken from :py:class:`VFRTimecodes`.
+
+        :return:            Decimated clip.
+        """
+
+        if clip.num_frames != len(self):
+            raise CustomValueError(
+                'The stats don\'t match the clip length! ({stats} != {clip})', func or self.decimate,
+                stats=len(self), clip=clip.num_frames
+            )
+
+        return DecimationPlan.from_stats(self, vfr_thr).apply(clip, func or self.decimate)
+
+
+class VFRTimecodes:
+    """
+    Writer of v2 timecodes files for hybrid 24p/30p decimation.
+
+    Cycles are written one at a time, so the file can be streamed out while the clip is being analysed.
+    Cycles that are decimated have their frames stretched over the duration of the whole cycle.
+
+    .. code-block:: python
+
+        >>> with VFRTimecodes('timecodes.txt', clip.fps) as tc:
+        ...     stats = VDecimateStats.from_clip(dryrun, on_cycle=tc.write_cycle)
+    """
+
+    def __init__(self, path: SPathLike, fps: Fraction, vfr_thr: float = 0.5) -> None:
+        """
+        :param path:        Timecodes file to write.
+        :param fps:         Framerate of the clip before decimation.
+        :param vfr_thr:     Duplicate threshold. See :py:meth:`VDecimateStats.is_film`.
+        """
+
+        if not fps.numerator:
+            raise CustomValueError('The framerate must be known to write timecodes!', self.__class__, fps)
+
+        self.path = SPath(path)
+        self.fps = fps
+        self.vfr_thr = vfr_thr
+
+        self.time = Fraction(0)
+        self.file: TextIO | None = None
+
+    def __enter__(self) -> VFRTimecodes:
+        self.file = open(self.path, 'w')
+        self.file.write('# timecode format v2\n')
+
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def write_cycle(self, stats: VDecimateStats, index: int) -> None:
+        """Write the timestamps of the frames kept from cycle ``index``."""
+
+        assert self.file
+
+        kept = stats.cycle_frames(index, self.vfr_thr)
+
+        if not kept:
+            return
+
+        duration = Fraction(len(stats.cycle_range(index)), len(kept)) / self.fps
+
+        for _ in kept:
+            self.file.write(f'{float(self.time * 1000):.6f}\n')
+            self.time += duration
+
+        self.file.flush()
+
+
+class DecimationPlan:
+    """
+    Compiled decimation: the input frame of every output frame, stored in an int32 array.
+
+    A plan is applied with a single remap node no matter how it was built,
+    so graph construction stays cheap and random access is O(1) even on very long sources.
+
+    .. code-block:: python
+
+        >>> plan = DecimationPlan.from_cycles(IVTCycles.cycle_10, dw.num_frames, find_ivtc_patterns(src))
+        >>> plan.save('episode01.plan')
+        >>> ivtc = DecimationPlan.load('episode01.plan').apply(dw)
+    """
+
+    MAGIC = b'DCPL'
+    VERSION = 1
+
+    _header = struct.Struct('<4sBxxxIII')
+
+    frame_map: array[int]
+    """Input frame of every output frame."""
+
+    rate: Fraction | None
+    """Framerate of the output relative to the input, or None if the output is variable framerate."""
+
+    def __init__(self, frame_map: Sequence[int], rate: Fraction | None = None) -> None:
+        self.frame_map = array('i', frame_map)
+        self.rate = rate
+
+    def __len__(self) -> int:
+        return len(self.frame_map)
+
+    def __getitem__(self, n: int) -> int:
+        return self.frame_map[n]
+
+    @classmethod
+    def from_cycles(
+        cls, ivtc_cycle: IVTCycles | PulldownCycle, num_frames: int, pattern: int | Mapping[int, int] = 0,
+        span: int | Fraction | None = None
+    ) -> DecimationPlan:
+        """
+        Build a plan from a fixed cycle.
+
+        :param ivtc_cycle:  Cycle to decimate with.
+        :param num_frames:  Number of frames of the clip to decimate.
+        :param pattern:     Pattern, or mapping of the first source frame of every section to its pattern.
+                            See :py:meth:`IVTCycles.frame_map`.
+        :param span:        Number of source frames a cycle covers. See :py:meth:`IVTCycles.frame_map`.
+        """
+
+        return cls(
+            ivtc_cycle.frame_map(num_frames, pattern, span),
+            Fraction(len(ivtc_cycle.value[0]), ivtc_cycle.pattern_length)
+        )
+
+    @classmethod
+    def from_stats(cls, stats: VDecimateStats, vfr_thr: float | None = None) -> DecimationPlan:
+        """
+        Build a plan from VDecimate decisions.
+
+        :param stats:       Collected VDecimate stats.
+        :param vfr_thr:     If not None, only decimate the 24p cycles. See :py:meth:`VDecimateStats.is_film`.
+        """
+
+        if vfr_thr is not None:
+            return cls(stats.vfr_frame_map(vfr_thr))
+
+        return cls(stats.kept, Fraction(stats.cycle - 1, stats.cycle))
+
+    def save(self, path: SPathLike) -> None:
+        """Write the plan to a binary file."""
+
+        num, den = (self.rate.numerator, self.rate.denominator) if self.rate else (0, 0)
+
+        _write_arrays(path, self._header.pack(self.MAGIC, self.VERSION, num, den, len(self)), self.frame_map)
+
+    @classmethod
+    def load(cls, path: SPathLike, func: FuncExceptT | None = None) -> DecimationPlan:
+        """Read a plan previously written with :py:meth:`save`."""
+
+        data = memoryview(SPath(path).read_bytes())
+
+        if len(data) < cls._header.size:
+            raise CustomValueError('The plan file is truncated!', func or cls.load, path)
+
+        magic, version, num, den, length = cls._header.unpack_from(data)
+
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise CustomValueError('This is not a valid decimation plan file!', func or cls.load, path)
+
+        frame_map, _ = _read_array(data, cls._header.size, 'i', length)
+
+        if len(frame_map) != length:
+            raise CustomValueError('The plan file is truncated!', func or cls.load, path)
+
+        return cls(frame_map, Fraction(num, den) if den else None)
+
+    def apply(self, clip: vs.VideoNode, func: FuncExceptT | None = None) -> vs.VideoNode:
+        """
+        Decimate a clip with the plan.
+
+        :param clip:        Clip to decimate.
+
+        :return:            Decimated clip.
+        """
+
+        if self.frame_map and max(self.frame_map) >= clip.num_frames:
+            raise CustomValueError(
+                'The plan references frames past the end of the clip! ({last} >= {clip})', func or self.apply,
+                last=max(self.frame_map), clip=clip.num_frames
+            )
+
+        fps = clip.fps * self.rate if self.rate is not None and clip.fps.numerator else None
+
+        return apply_frame_map(clip, self.frame_map, fps)
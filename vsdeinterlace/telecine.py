@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from fractions import Fraction
+from typing import Mapping, Sequence
+
+from vstools import CustomValueError, FieldBased, FuncExceptT, core, shift_clip, vs
+
+from .instrument import instrumented
+from .utils import apply_frame_map
+
+__all__ = [
+    'parse_pulldown',
+
+    'telecine_fields', 'telecine'
+]
+
+
+def parse_pulldown(pulldown: str | Sequence[int], func: FuncExceptT | None = None) -> list[int]:
+    """
+    Parse a pulldown cadence, like ``'3:2'`` or ``'2:3:3:2'``, into the number of fields of every film frame.
+
+    :param pulldown:    Pulldown string, or sequence of field counts.
+    :param func:        Function returned for custom error handling.
+
+    :return:            Fields shown for every film frame of the cadence.
+    """
+
+    func = func or parse_pulldown
+
+    try:
+        cadence = [int(fields) for fields in pulldown.split(':')] if isinstance(pulldown, str) else list(pulldown)
+    except ValueError:
+        raise CustomValueError('Invalid pulldown string!', func, pulldown)
+
+    if not cadence or any(fields < 1 for fields in cadence):
+        raise CustomValueError('Every film frame must be shown for at least one field!', func, pulldown)
+
+    return cadence
+
+
+def telecine_fields(
+    num_frames: int, pulldown: str | Sequence[int] = '3:2', phase: int | Mapping[int, int] = 0,
+    orphans: Sequence[int] = ()
+) -> list[int]:
+    """
+    Compute the film frame shown by every field of a telecined clip.
+
+    :param num_frames:  Number of film frames.
+    :param pulldown:    Pulldown cadence. See :py:func:`parse_pulldown`.
+    :param phase:       Number of fields of the cadence skipped at the start, or mapping of film frames
+                        to the phase the cadence restarts with from them, to create pattern breaks.
+                        The first film frame of a section always keeps at least one field.
+    :param orphans:     Film frames that only get a single field, as left over by bad edits.
+
+    :return:            Film frame of every field, in display order.
+    """
+
+    cadence = parse_pulldown(pulldown, telecine_fields)
+
+    phases = {0: phase} if isinstance(phase, int) else {0: 0} | dict(phase)
+    orphan_frames = set(orphans)
+
+    fields = list[int]()
+
+    slot = 0
+
+    for n in range(num_frames):
+        if n in phases:
+            slot, skip = 0, phases[n] % sum(cadence)
+
+            while skip >= cadence[slot]:
+                skip -= cadence[slot]
+                slot += 1
+
+            count = cadence[slot] - skip
+        else:
+            count = cadence[slot]
+
+        fields += [n] * (1 if n in orphan_frames else count)
+
+        slot = (slot + 1) % len(cadence)
+
+    return fields
+
+
+@instrumented
+def telecine(
+    clip: vs.VideoNode, pulldown: str | Sequence[int] = '3:2', phase: int | Mapping[int, int] = 0,
+    tff: bool = True, orphans: Sequence[int] = (), blends: Sequence[int] = ()
+) -> vs.VideoNode:
+    """
+    Apply pulldown to a progressive clip. This is the forward operation of :py:func:`sivtc`.
+
+    Every film frame is shown for the number of fields given by the cadence, alternating field parity.
+    Common cadences are ``'3:2'`` (23.976 to 29.97), ``'2:3:3:2'`` and Euro pulldown
+    (``'2:2:2:2:2:2:2:2:2:2:2:3'``, 24 to 25).
+
+    With 3:2 pulldown, ``sivtc(telecine(clip, phase=phase), pattern)`` returns the film frames
+    for ``pattern = 2 * phase % 5``, except for a first frame left with a single field.
+
+    .. code-block:: python
+
+        >>> telecined = telecine(film, '3:2', {0: 0, 1000: 3}, blends=[4242])
+
+    :param clip:        Progressive clip to telecine.
+    :param pulldown:    Pulldown cadence. See :py:func:`parse_pulldown`.
+    :param phase:       Phase of the cadence, or mapping of film frames to phases for pattern breaks.
+                        See :py:func:`telecine_fields`.
+    :param tff:         Whether the output is top field first.
+    :param orphans:     Film frames that only get a single field.
+    :param blends:      Output fields replaced by a blend of the field they show and the same field
+                        of the next film frame.
+
+    :return:            Telecined clip.
+    """
+
+    cadence = parse_pulldown(pulldown, telecine)
+
+    film_fields = clip.std.SeparateFields(tff)
+
+    field_map = [2 * n + k % 2 for k, n in enumerate(telecine_fields(clip.num_frames, cadence, phase, orphans))]
+    field_map = field_map[:len(field_map) & ~1]
+
+    if blends:
+        blend_fields = set(blends)
+
+        # Blended fields are taken from a second set of fields, spliced after the clean ones
+        blended = core.std.Merge(film_fields, shift_clip(film_fields, 2))
+        field_map = [n + film_fields.num_frames if k in blend_fields else n for k, n in enumerate(field_map)]
+        film_fields = film_fields + blended
+
+    fps = clip.fps * Fraction(sum(cadence), 2 * len(cadence)) if clip.fps else None
+
+    telecined = apply_frame_map(film_fields, field_map).std.DoubleWeave(tff).std.SelectEvery(2, 0)
+
+    if fps is not None:
+        telecined = telecined.std.AssumeFPS(fpsnum=fps.numerator, fpsden=fps.denominator)
+
+    return (FieldBased.TFF if tff else FieldBased.BFF).apply(telecined)
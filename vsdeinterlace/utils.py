@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from vstools import core, vs
+from fractions import Fraction
+from typing import Sequence
+
+from vstools import FieldBased, clip_async_render, core, get_prop, get_y, vs
 
 __all__ = [
     'telecine_patterns',
+
+    'apply_frame_map',
+
+    'detect_field_order'
 ]
 
 
@@ -16,3 +23,100 @@ def telecine_patterns(clipa: vs.VideoNode, clipb: vs.VideoNode, length: int = 5)
             (b_select if i == j else a_select)[j] for j in range(length)
         ]) for i in range(length)
     ]
+
+
+def apply_frame_map(
+    clip: vs.VideoNode, frame_map: Sequence[int], fps: Fraction | None = None
+) -> vs.VideoNode:
+    """
+    Build a clip where output frame ``n`` is ``clip[frame_map[n]]``.
+
+    If RemapFrames is available this is a single native node, otherwise it falls back to a FrameEval.
+
+    :param clip:        Clip to pull frames from.
+    :param frame_map:   Source frame number for every output frame.
+    :param fps:         Framerate of the output clip. Default: same as the input clip.
+
+    :return:            Remapped clip.
+    """
+
+    if hasattr(core, 'remap'):
+        remapped = clip.remap.RemapFramesSimple(mappings=' '.join(map(str, frame_map)))
+    else:
+        frame_map = list(frame_map)
+
+        remapped = clip.std.BlankClip(length=len(frame_map), keep=True).std.FrameEval(
+            lambda n: clip[frame_map[n]], None, clip
+        )
+
+    if fps is not None:
+        remapped = remapped.std.AssumeFPS(fpsnum=fps.numerator, fpsden=fps.denominator)
+
+    return remapped
+
+
+def detect_field_order(
+    clip: vs.VideoNode, samples: int = 300, threshold: float = 0.1
+) -> tuple[FieldBased, float]:
+    """
+    Detect the field order of an interlaced clip from a few frames spread across it.
+
+    With the right field order, the second field of a frame is temporally between the first field
+    and the first field of the next frame, so it's closer to their average than the other field is.
+    For every sampled frame both orders are compared on the luma, and each order gets a vote
+    if its difference is clearly lower than the other one's.
+
+    :param clip:        Interlaced clip.
+    :param samples:     Number of frames to sample.
+    :param threshold:   Relative difference between the two orders for a sample to vote.
+
+    :return:            Detected field order and the fraction of the votes it got.
+                        If no sample could tell the orders apart, for example on static or progressive content,
+                        TFF is returned with a confidence of 0.
+    """
+
+    last = clip.num_frames - 1
+    step = max(last / max(samples, 1), 1)
+
+    frames = sorted({int(i * step) for i in range(min(samples, last))})
+
+    if not frames:
+        return FieldBased.TFF, 0.0
+
+    # SeparateFields follows the field order tag over its tff argument, so the tag is cleared first
+    luma = FieldBased.PROGRESSIVE.apply(get_y(clip))
+
+    fields = apply_frame_map(luma, frames).std.SeparateFields(True)
+    next_fields = apply_frame_map(luma, [n + 1 for n in frames]).std.SeparateFields(True)
+
+    top, bottom = fields[::2], fields[1::2]
+    next_top, next_bottom = next_fields[::2], next_fields[1::2]
+
+    expr = 'x y z + 2 / - abs'
+
+    tff_diff = core.std.Expr([bottom, top, next_top], expr).std.PlaneStats(prop='TFF')
+    bff_diff = core.std.Expr([top, bottom, next_bottom], expr).std.PlaneStats(prop='BFF')
+
+    diffs = clip_async_render(
+        tff_diff.std.CopyFrameProps(bff_diff, 'BFFAverage'), None, None,
+        lambda n, f: (get_prop(f, 'TFFAverage', float), get_prop(f, 'BFFAverage', float))
+    )
+
+    tff_votes = bff_votes = 0
+
+    for tff, bff in diffs:
+        if abs(tff - bff) <= threshold * max(tff, bff):
+            continue
+
+        if tff < bff:
+            tff_votes += 1
+        else:
+            bff_votes += 1
+
+    if not tff_votes + bff_votes:
+        return FieldBased.TFF, 0.0
+
+    if tff_votes >= bff_votes:
+        return FieldBased.TFF, tff_votes / (tff_votes + bff_votes)
+
+    return FieldBased.BFF, bff_votes / (tff_votes + bff_votes)